@@ -0,0 +1,251 @@
+import os
+import pickle
+import tempfile
+import threading
+import multiprocessing
+from contextlib import contextmanager
+
+try:
+    import resource  # Not available on Windows; limits are skipped there
+except ImportError:
+    resource = None
+
+# Admission control for the PDF routes. A job is only started if the
+# client isn't already running too many, the server isn't swamped, and a
+# cheap look at the uploaded PDFs (size, page count, object count) says it
+# is reasonable. Each job then runs in a process of its own that is capped
+# in CPU time, memory and wall-clock time, so one nasty file can't take the
+# server (or anybody else's job) down with it.
+
+# --- CONFIGURATION ---
+
+# 1. Largest multipart request body (Flask's MAX_CONTENT_LENGTH).
+MAX_REQUEST_BYTES = 512 * 1024 * 1024
+
+# 2. Per-job limits inside the job's process. Wall-clock time counts from
+#    the moment the job starts running, not from when it was queued.
+JOB_CPU_SECONDS = 120
+JOB_MEMORY_BYTES = 2 * 1024 * 1024 * 1024
+JOB_WALL_SECONDS = 300
+
+# 3. Largest input (all files of one job together, and so also the largest
+#    chunked upload). A job holds its input, the open documents and the
+#    output at once, so this has to stay well below JOB_MEMORY_BYTES.
+MAX_INPUT_BYTES = JOB_MEMORY_BYTES // 4
+
+# 4. Most pages per job (all inputs together).
+MAX_PAGES = 5000
+
+# 5. Most PDF objects (xref entries) in any one input.
+MAX_OBJECTS = 2000000
+
+# 6. How many jobs one client (IP address) may have running at once.
+MAX_JOBS_PER_CLIENT = 2
+
+# 7. How many jobs run at once, and how many more may wait for a slot.
+MAX_CONCURRENT_JOBS = int(os.environ.get('PDF_WORKERS', os.cpu_count() or 1))
+MAX_WAITING_JOBS = 2 * MAX_CONCURRENT_JOBS
+
+class AdmissionError(Exception):
+    """
+    Raised when a job is refused or stopped by one of the limits above.
+    The message is meant for the user.
+    """
+
+class BusyError(AdmissionError):
+    """
+    Raised when the job itself is fine but has to wait its turn (the client
+    or the server already has enough running).
+    """
+
+TOO_BIG_MESSAGE = 'This PDF needed more processing time or memory than we allow per job.'
+OUT_OF_MEMORY_MESSAGE = 'This PDF needs more memory than we allow per job.'
+
+# --- BOOKKEEPING (in the web process) ---
+
+_lock = threading.Lock()
+_in_process_lock = threading.Lock()  # PyMuPDF isn't thread-safe
+_running_slots = threading.BoundedSemaphore(MAX_CONCURRENT_JOBS)
+_jobs_per_client = {}
+_jobs_in_system = 0
+
+# Job processes are forked from a small server process that has already
+# imported PyMuPDF, so they start quickly and don't inherit the web
+# process's memory (which would count against their address-space limit).
+if 'forkserver' in multiprocessing.get_all_start_methods():
+    _context = multiprocessing.get_context('forkserver')
+    _context.set_forkserver_preload(['pdf_operations'])
+else:
+    _context = multiprocessing.get_context('spawn')
+
+@contextmanager
+def job_slot(client_id):
+    """
+    Reserves a job slot for 'client_id' for the duration of the block.
+    """
+    global _jobs_in_system
+    with _lock:
+        if _jobs_per_client.get(client_id, 0) >= MAX_JOBS_PER_CLIENT:
+            raise BusyError('You already have jobs running. Please wait for them to finish.')
+        if _jobs_in_system >= MAX_CONCURRENT_JOBS + MAX_WAITING_JOBS:
+            raise BusyError('The server is busy right now. Please try again in a minute.')
+        _jobs_per_client[client_id] = _jobs_per_client.get(client_id, 0) + 1
+        _jobs_in_system += 1
+    try:
+        yield
+    finally:
+        with _lock:
+            _jobs_in_system -= 1
+            _jobs_per_client[client_id] -= 1
+            if not _jobs_per_client[client_id]:
+                del _jobs_per_client[client_id]
+
+# --- JOB PROCESS SIDE ---
+
+def _apply_limits(cpu_seconds, memory_bytes):
+    """
+    Caps this (fresh) process's address space and CPU time. Going over the
+    CPU limit makes the kernel send SIGXCPU, which ends the process.
+    """
+    if resource is None:
+        return
+    _, hard = resource.getrlimit(resource.RLIMIT_AS)
+    resource.setrlimit(resource.RLIMIT_AS, (memory_bytes, hard))
+    _, hard = resource.getrlimit(resource.RLIMIT_CPU)
+    soft = cpu_seconds if hard == resource.RLIM_INFINITY else min(cpu_seconds, hard)
+    resource.setrlimit(resource.RLIMIT_CPU, (soft, hard))
+
+def is_out_of_memory(error):
+    """
+    True for Python's MemoryError and for MuPDF's failed allocations
+    (reported as "malloc (...) failed").
+    """
+    return isinstance(error, MemoryError) or 'malloc' in str(error) or 'out of memory' in str(error).lower()
+
+def preflight(pdf_bytes_list, max_pages=None, max_objects=None):
+    """
+    Cheap checks before the real work: opens each PDF (which only reads
+    its cross-reference table) and rejects it if it has too many objects,
+    or if all inputs together have too many pages. The limits default to
+    MAX_PAGES and MAX_OBJECTS.
+    """
+    max_pages = max_pages or MAX_PAGES
+    max_objects = max_objects or MAX_OBJECTS
+    import fitz  # PyMuPDF
+
+    total_pages = 0
+    for pdf_bytes in pdf_bytes_list:
+        try:
+            doc = fitz.open(stream=pdf_bytes, filetype="pdf")
+        except Exception:
+            continue  # The operation itself reports unreadable files (InvalidPDFError)
+        with doc:
+            if doc.xref_length() > max_objects:
+                raise AdmissionError('This PDF is too complex to process here.')
+            total_pages += doc.page_count
+    if total_pages > max_pages:
+        raise AdmissionError(f'Too many pages: {total_pages}. The limit is {max_pages} per job.')
+
+def _run_job(connection, func, input_paths, single, args, limits):
+    """
+    Body of a job process: reads the spooled inputs, runs the checks and
+    the operation, and sends back ('ok', result) or ('error', exception).
+    'limits' carries the web process's settings, which may differ from
+    this fresh import's defaults.
+    """
+    _apply_limits(limits['cpu_seconds'], limits['memory_bytes'])
+    try:
+        pdf_bytes_list = []
+        for path in input_paths:
+            with open(path, 'rb') as f:
+                pdf_bytes_list.append(f.read())
+        preflight(pdf_bytes_list, limits['max_pages'], limits['max_objects'])
+        message = ('ok', func(pdf_bytes_list[0] if single else pdf_bytes_list, *args))
+    except Exception as e:
+        message = ('error', AdmissionError(OUT_OF_MEMORY_MESSAGE) if is_out_of_memory(e) else e)
+
+    try:
+        connection.send(message)
+    except Exception as e:
+        # Some exceptions (e.g. MuPDF's own) can't be sent between processes.
+        error = message[1] if message[0] == 'error' else e
+        if is_out_of_memory(e):
+            error = AdmissionError(OUT_OF_MEMORY_MESSAGE)
+        try:
+            pickle.dumps(error)
+        except Exception:
+            error = RuntimeError(str(error))
+        connection.send(('error', error))
+    connection.close()
+
+# --- MAIN ENTRY POINT ---
+
+def _run_in_process(func, pdf_bytes_list, single, args):
+    """
+    Runs one job in a process of its own and waits at most JOB_WALL_SECONDS
+    for it. A job that breaks a limit is killed; nothing else is affected.
+    """
+    with tempfile.TemporaryDirectory(prefix='pdf_job_') as spool_dir:
+        # Inputs go to the job as files, so they aren't pickled through a pipe.
+        input_paths = []
+        for number, pdf_bytes in enumerate(pdf_bytes_list):
+            path = os.path.join(spool_dir, f'{number}.pdf')
+            with open(path, 'wb') as f:
+                f.write(pdf_bytes)
+            input_paths.append(path)
+
+        limits = {'cpu_seconds': JOB_CPU_SECONDS, 'memory_bytes': JOB_MEMORY_BYTES,
+                  'max_pages': MAX_PAGES, 'max_objects': MAX_OBJECTS}
+        receiver, sender = _context.Pipe(duplex=False)
+        process = _context.Process(target=_run_job, args=(sender, func, input_paths, single, args, limits),
+                                   daemon=True)
+        process.start()
+        sender.close()
+
+        received = False
+        try:
+            if not receiver.poll(JOB_WALL_SECONDS):
+                raise AdmissionError('This job took too long and was stopped.')
+            try:
+                status, value = receiver.recv()
+            except EOFError:
+                # The process ended without an answer: killed by a limit.
+                raise AdmissionError(TOO_BIG_MESSAGE)
+            received = True
+        finally:
+            process.join(5 if received else 0)
+            if process.is_alive():
+                process.kill()
+                process.join()
+            receiver.close()
+
+    if status == 'error':
+        raise value
+    return value
+
+def run_limited(client_id, func, pdf_input, *args):
+    """
+    Runs func(pdf_input, *args) under all the limits above and returns its
+    result. 'pdf_input' is the PDF bytes, or a list of them, that 'func'
+    works on; 'func' must be importable (e.g. a pdf_operations function).
+    Raises AdmissionError if the job is refused or stopped; other errors
+    from 'func' are raised as they are.
+    """
+    single = not isinstance(pdf_input, list)
+    pdf_bytes_list = [pdf_input] if single else pdf_input
+    if sum(len(pdf_bytes) for pdf_bytes in pdf_bytes_list) > MAX_INPUT_BYTES:
+        raise AdmissionError(f'Files larger than {MAX_INPUT_BYTES // (1024 * 1024)} MB '
+                             f'(all files of a job together) are not accepted.')
+
+    with job_slot(client_id):
+        if multiprocessing.current_process().daemon:
+            # Daemonic processes (e.g. some ASGI server workers) can't have
+            # child processes; run in-process, one job at a time, with only
+            # the cheap checks.
+            with _in_process_lock:
+                preflight(pdf_bytes_list)
+                return func(pdf_input, *args)
+
+        # Waiting here is bounded by job_slot; the job's clock starts after.
+        with _running_slots:
+            return _run_in_process(func, pdf_bytes_list, single, args)
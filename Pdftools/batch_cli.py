@@ -0,0 +1,295 @@
+import os
+import sys
+import json
+import glob
+import time
+import argparse
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import pdf_operations
+import output_profiles
+
+# Command-line front end for the toolkit, for batch jobs that should not
+# need a web server. Examples:
+#
+#   python batch_cli.py number 'scans/**/*.pdf' -o numbered/ -j 8
+#   python batch_cli.py split book.pdf --ranges "1-3, 5" -o parts/
+#   python batch_cli.py merge --manifest order.txt -o merged.pdf --profile web --image-dpi 150
+#   python batch_cli.py pipeline book.pdf cover.pdf -o out.pdf \
+#       --ops '[{"op": "select_pages", "ranges": "3-40"}, {"op": "add_page_numbers"},
+#               {"op": "merge", "inputs": [1], "position": "start"}]'
+#
+# Progress goes to stderr. Pass --json to get one JSON object per finished
+# file on stdout, which is easy to consume from other scripts.
+
+# --- INPUT COLLECTION ---
+
+def read_manifest(manifest_path):
+    """
+    Reads a manifest file: one path or glob per line. Blank lines and
+    lines starting with '#' are ignored. Relative entries are resolved
+    against the manifest's own folder.
+    """
+    base_dir = os.path.dirname(os.path.abspath(manifest_path))
+    entries = []
+    with open(manifest_path, encoding='utf-8') as manifest:
+        for line in manifest:
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
+            if not os.path.isabs(line):
+                line = os.path.join(base_dir, line)
+            entries.append(line)
+    return entries
+
+def collect_inputs(patterns, manifests):
+    """
+    Expands globs and manifest entries into an ordered list of PDF paths,
+    dropping duplicates but keeping the first-seen order.
+    """
+    entries = list(patterns)
+    for manifest_path in manifests:
+        entries.extend(read_manifest(manifest_path))
+
+    seen = set()
+    pdf_paths = []
+    for entry in entries:
+        matches = sorted(glob.glob(entry, recursive=True)) if glob.has_magic(entry) else [entry]
+        for path in matches:
+            key = os.path.normcase(os.path.abspath(path))
+            if not path.lower().endswith('.pdf') or key in seen:
+                continue
+            seen.add(key)
+            pdf_paths.append(path)
+    return pdf_paths
+
+def output_stems(pdf_paths):
+    """
+    Maps each input to its path relative to the folder all inputs share,
+    without the extension (e.g. 'vol1/book'). Outputs keep that folder
+    structure under the output folder, so two 'book.pdf' from different
+    folders don't overwrite each other.
+    """
+    abs_paths = [os.path.abspath(path) for path in pdf_paths]
+    try:
+        base_dir = os.path.commonpath([os.path.dirname(path) for path in abs_paths])
+        relative = [os.path.relpath(path, base_dir) for path in abs_paths]
+    except ValueError:
+        # Inputs on different drives (Windows) share no folder.
+        relative = [os.path.splitdrive(path)[1].lstrip('\\/') for path in abs_paths]
+    return {path: os.path.splitext(rel)[0] for path, rel in zip(pdf_paths, relative)}
+
+# --- WORKERS (run inside the process pool) ---
+
+def _read_bytes(path):
+    with open(path, 'rb') as f:
+        return f.read()
+
+def _write_bytes(path, data):
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    with open(path, 'wb') as f:
+        f.write(data)
+
+def number_file(pdf_path, output_stem, profile):
+    output_path = f'{output_stem}_numbered.pdf'
+    numbered_pdf, report = pdf_operations.number_pdf_bytes(_read_bytes(pdf_path), profile)
+    _write_bytes(output_path, numbered_pdf)
+    return [output_path], report
+
+def split_file(pdf_path, output_stem, page_ranges_str, profile):
+    outputs = []
+    parts, report = pdf_operations.split_pdf_bytes(_read_bytes(pdf_path), page_ranges_str, profile)
+    if not parts:
+        raise ValueError('The specified page ranges are not valid for this document.')
+    for filename, data in parts:
+        output_path = f'{output_stem}_{filename}'
+        _write_bytes(output_path, data)
+        outputs.append(output_path)
+    return outputs, report
+
+def run_job(job):
+    """
+    Runs one (operation, pdf_path, output_stem, options) job and returns a
+    result dict. Errors are reported in the result instead of being raised,
+    so one bad file never stops the batch.
+    """
+    operation, pdf_path, output_stem, options = job
+    started = time.perf_counter()
+    try:
+        if operation == 'number':
+            outputs, report = number_file(pdf_path, output_stem, options['profile'])
+        else:
+            outputs, report = split_file(pdf_path, output_stem, options['ranges'], options['profile'])
+        result = {'input': pdf_path, 'ok': True, 'outputs': outputs, 'save': report}
+    except Exception as e:
+        result = {'input': pdf_path, 'ok': False, 'error': str(e)}
+    result['seconds'] = round(time.perf_counter() - started, 3)
+    return result
+
+# --- PROGRESS REPORTING ---
+
+def report_progress(result, done, total, as_json):
+    if as_json:
+        print(json.dumps(result), flush=True)
+    if result['ok']:
+        save = result['save']
+        detail = f"{len(result['outputs'])} file(s), {save['size']} bytes, saved in {save['seconds']}s [{save['profile']}]"
+    else:
+        detail = f"ERROR: {result['error']}"
+    print(f"[{done}/{total}] {result['input']} -> {detail} ({result['seconds']}s)",
+          file=sys.stderr, flush=True)
+
+# --- COMMANDS ---
+
+def run_per_file(operation, pdf_paths, options, jobs, as_json):
+    """
+    Runs a per-file operation across a process pool, reporting each file
+    as soon as it finishes. Returns the number of failed files.
+    """
+    os.makedirs(options['output_dir'], exist_ok=True)
+    stems = output_stems(pdf_paths)
+    work = [(operation, path, os.path.join(options['output_dir'], stems[path]), options) for path in pdf_paths]
+    failures = 0
+
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        futures = [pool.submit(run_job, job) for job in work]
+        for done, future in enumerate(as_completed(futures), start=1):
+            result = future.result()
+            failures += not result['ok']
+            report_progress(result, done, len(work), as_json)
+    return failures
+
+def run_merge(pdf_paths, output_path, profile, image_dpi, as_json):
+    """
+    Merges every input (in order) into a single output file in one
+    sequential pass.
+    """
+    started = time.perf_counter()
+    try:
+        # Read here rather than in worker processes: reading is I/O bound,
+        # and sending every file back through a pipe only doubles the copying.
+        pdf_bytes_list = [_read_bytes(path) for path in pdf_paths]
+        merged_pdf, report = pdf_operations.merge_pdf_bytes(pdf_bytes_list, profile, image_dpi)
+        if merged_pdf is None:
+            raise ValueError('No valid PDFs were provided to merge.')
+        _write_bytes(output_path, merged_pdf)
+        result = {'input': pdf_paths, 'ok': True, 'outputs': [output_path], 'save': report}
+    except Exception as e:
+        result = {'input': pdf_paths, 'ok': False, 'error': str(e)}
+    result['seconds'] = round(time.perf_counter() - started, 3)
+
+    report_progress(dict(result, input=f'{len(pdf_paths)} file(s)'), 1, 1, False)
+    if as_json:
+        print(json.dumps(result), flush=True)
+    return 0 if result['ok'] else 1
+
+def run_pipeline(pdf_paths, operations, output_path, profile, as_json):
+    """
+    Runs a pipeline (see pdf_operations.run_pipeline) over the inputs, in
+    the order given, and writes the single result.
+    """
+    started = time.perf_counter()
+    try:
+        output_pdf, report = pdf_operations.run_pipeline(
+            [_read_bytes(path) for path in pdf_paths], operations, profile)
+        _write_bytes(output_path, output_pdf)
+        result = {'input': pdf_paths, 'ok': True, 'outputs': [output_path], 'save': report}
+    except Exception as e:
+        result = {'input': pdf_paths, 'ok': False, 'error': str(e)}
+    result['seconds'] = round(time.perf_counter() - started, 3)
+
+    report_progress(dict(result, input=f'{len(pdf_paths)} file(s)'), 1, 1, False)
+    if as_json:
+        print(json.dumps(result), flush=True)
+    return 0 if result['ok'] else 1
+
+def load_operations(ops):
+    """
+    Reads pipeline steps from a JSON string, or from a file when 'ops'
+    starts with '@'.
+    """
+    if ops.startswith('@'):
+        with open(ops[1:], encoding='utf-8') as f:
+            return json.load(f)
+    return json.loads(ops)
+
+def positive_int(value):
+    number = int(value)
+    if number <= 0:
+        raise argparse.ArgumentTypeError(f'must be a positive number, not {value}')
+    return number
+
+def build_parser():
+    parser = argparse.ArgumentParser(description='Batch PDF toolkit: merge, number and split PDFs.')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    def add_common(sub):
+        sub.add_argument('inputs', nargs='*', help='PDF paths or glob patterns (quote globs; ** is recursive)')
+        sub.add_argument('-m', '--manifest', action='append', default=[],
+                         help='file listing one PDF path or glob per line (repeatable)')
+        sub.add_argument('-j', '--jobs', type=positive_int, default=os.cpu_count(),
+                         help='number of worker processes (default: CPU count)')
+        sub.add_argument('--json', action='store_true', help='print one JSON result per line on stdout')
+        sub.add_argument('-p', '--profile', default=output_profiles.DEFAULT_PROFILE,
+                         choices=list(output_profiles.OUTPUT_PROFILES),
+                         help='output profile used to save every PDF (default: %(default)s)')
+
+    merge = subparsers.add_parser('merge', help='merge all inputs into one PDF')
+    add_common(merge)
+    merge.add_argument('-o', '--output', required=True, help='path of the merged PDF')
+    merge.add_argument('--image-dpi', type=positive_int, default=None,
+                       help='downsample and recompress images shown above this resolution')
+
+    number = subparsers.add_parser('number', help='add page numbers to each input')
+    add_common(number)
+    number.add_argument('-o', '--output-dir', required=True, help='folder for the numbered PDFs')
+
+    split = subparsers.add_parser('split', help='split each input by page ranges')
+    add_common(split)
+    split.add_argument('-r', '--ranges', required=True, help='page ranges, e.g. "1-3, 5, 8-10"')
+    split.add_argument('-o', '--output-dir', required=True, help='folder for the split PDFs')
+
+    pipeline = subparsers.add_parser('pipeline', help='run several operations on the inputs in one pass')
+    add_common(pipeline)
+    pipeline.add_argument('--ops', required=True,
+                          help='JSON list of steps, or @file.json (input 0 is the document being built)')
+    pipeline.add_argument('-o', '--output', required=True, help='path of the resulting PDF')
+
+    return parser
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    pdf_paths = collect_inputs(args.inputs, args.manifest)
+    if not pdf_paths:
+        print('No PDF files matched the given inputs.', file=sys.stderr)
+        return 2
+
+    if args.command == 'split':
+        # Fail fast on a bad range string instead of once per file.
+        try:
+            pdf_operations.parse_page_ranges(args.ranges)
+        except ValueError:
+            print('Invalid page range format. Please use formats like "1-3, 5, 8-10".', file=sys.stderr)
+            return 2
+
+    if args.command == 'pipeline':
+        try:
+            operations = load_operations(args.ops)
+        except (OSError, ValueError) as e:
+            print(f'Could not read the pipeline operations: {e}', file=sys.stderr)
+            return 2
+        return run_pipeline(pdf_paths, operations, args.output, args.profile, args.json)
+
+    if args.command == 'merge':
+        if len(pdf_paths) < 2:
+            print('Please give at least two PDF files to merge.', file=sys.stderr)
+            return 2
+        return run_merge(pdf_paths, args.output, args.profile, args.image_dpi, args.json)
+
+    options = {'output_dir': args.output_dir, 'profile': args.profile}
+    if args.command == 'split':
+        options['ranges'] = args.ranges
+    failures = run_per_file(args.command, pdf_paths, options, args.jobs, args.json)
+    return 1 if failures else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,58 @@
+import os
+import sys
+import time
+import argparse
+import statistics
+import subprocess
+
+# Measures what a cold start costs: a fresh Python process imports the app
+# and serves the first (and second) request for the index page. Every run
+# uses a new interpreter, so nothing is warm except the OS file cache.
+#
+#   python bench_startup.py            # main2.py, 15 runs
+#   python bench_startup.py main -n 30 # the older single-file app
+#
+# The "eager" row imports fitz and reportlab up front, the way the apps
+# used to, so the difference shows what lazy loading saves.
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+CHILD_SCRIPT = """
+import time
+started = time.perf_counter()
+if {eager}:
+    import fitz, reportlab.pdfgen.canvas, zipfile, re
+import {module} as app_module
+imported = time.perf_counter()
+client = app_module.app.test_client()
+assert client.get('/').status_code == 200
+first = time.perf_counter()
+client.get('/')
+second = time.perf_counter()
+print(imported - started, first - imported, second - first)
+"""
+
+def run_once(module, eager):
+    code = CHILD_SCRIPT.format(module=module, eager=eager)
+    output = subprocess.run([sys.executable, '-c', code], cwd=HERE, check=True,
+                            capture_output=True, text=True).stdout
+    # Only the last line is ours; fitz may print notices of its own.
+    return [float(value) for value in output.strip().splitlines()[-1].split()]
+
+def main():
+    parser = argparse.ArgumentParser(description='Cold-start benchmark for the Flask apps.')
+    parser.add_argument('module', nargs='?', default='main2', help='app module to load (default: main2)')
+    parser.add_argument('-n', '--runs', type=int, default=15, help='number of fresh processes per case')
+    args = parser.parse_args()
+
+    print(f"Cold start of '{args.module}', median of {args.runs} runs (milliseconds)\n")
+    print(f"{'case':<8}{'import':>10}{'1st GET /':>12}{'2nd GET /':>12}{'total':>10}")
+    for label, eager in (('lazy', False), ('eager', True)):
+        samples = [run_once(args.module, eager) for _ in range(args.runs)]
+        imported, first, second = (statistics.median(column) * 1000 for column in zip(*samples))
+        print(f"{label:<8}{imported:>10.1f}{first:>12.2f}{second:>12.3f}{imported + first:>10.1f}")
+
+if __name__ == '__main__':
+    start = time.perf_counter()
+    main()
+    print(f"\nFinished in {time.perf_counter() - start:.1f}s")
@@ -0,0 +1,197 @@
+import os
+import re
+import uuid
+import json
+import time
+import shutil
+import hashlib
+import tempfile
+
+# Server side of the chunked upload API. Each upload gets a spool file of
+# the final size plus a folder of small marker files, one per received
+# chunk. Chunks can arrive in any order (and in parallel) because each one
+# is written straight to its own offset in the spool file. A client that
+# lost its connection asks which chunks are already here and sends only
+# the missing ones.
+
+# --- CONFIGURATION ---
+
+# 1. Where the spool files are kept while an upload is in progress.
+UPLOAD_DIR = os.environ.get('PDF_UPLOAD_DIR', os.path.join(tempfile.gettempdir(), 'pdf_toolkit_uploads'))
+
+# 2. The chunk size we ask clients to use. The last chunk may be smaller.
+CHUNK_SIZE = 8 * 1024 * 1024
+
+# 3. The biggest upload we accept through this API.
+MAX_UPLOAD_SIZE = 4 * 1024 * 1024 * 1024
+
+# 4. Uploads that get no new chunk for this long (in seconds) are deleted,
+#    finished or not.
+UPLOAD_MAX_AGE = 24 * 60 * 60
+
+# 5. How often (in seconds) we look for abandoned uploads.
+CLEANUP_INTERVAL = 10 * 60
+
+# 6. How many uploads may be in progress at once (all clients together).
+MAX_PENDING_UPLOADS = 200
+
+# How much of a chunk body we read from the socket at a time.
+_COPY_BUFFER = 256 * 1024
+
+_UPLOAD_ID_PATTERN = re.compile(r'^[0-9a-f]{32}$')
+_last_cleanup = 0.0
+
+# --- PATH HELPERS ---
+
+def _upload_paths(upload_id):
+    """
+    Returns (meta_path, spool_path, parts_dir) for an upload id, refusing
+    anything that is not one of our own ids.
+    """
+    if not _UPLOAD_ID_PATTERN.match(upload_id or ''):
+        raise ValueError('Unknown upload id.')
+    base = os.path.join(UPLOAD_DIR, upload_id)
+    return base + '.json', base + '.spool', base + '.parts'
+
+def _load_meta(upload_id):
+    meta_path, _, _ = _upload_paths(upload_id)
+    try:
+        with open(meta_path, encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        raise ValueError('Unknown upload id.')
+
+# --- API ---
+
+def create_upload(filename, total_size):
+    """
+    Starts a new upload and returns its description (id, chunk size).
+    """
+    if not filename or not filename.lower().endswith('.pdf'):
+        raise ValueError('Invalid file type. Please upload a PDF.')
+    if not isinstance(total_size, int) or not 0 < total_size <= MAX_UPLOAD_SIZE:
+        raise ValueError('Invalid upload size.')
+
+    os.makedirs(UPLOAD_DIR, exist_ok=True)
+    remove_expired_uploads()
+    if sum(name.endswith('.json') for name in os.listdir(UPLOAD_DIR)) >= MAX_PENDING_UPLOADS:
+        raise ValueError('Too many uploads are in progress right now. Please try again later.')
+
+    upload_id = uuid.uuid4().hex
+    meta_path, spool_path, parts_dir = _upload_paths(upload_id)
+
+    # Reserve the full size up front so chunks can land at any offset.
+    with open(spool_path, 'wb') as spool:
+        spool.truncate(total_size)
+    os.makedirs(parts_dir)
+
+    meta = {'upload_id': upload_id, 'filename': os.path.basename(filename),
+            'size': total_size, 'chunk_size': CHUNK_SIZE}
+    with open(meta_path, 'w', encoding='utf-8') as f:
+        json.dump(meta, f)
+    return meta
+
+def write_chunk(upload_id, offset, stream, expected_sha256=None):
+    """
+    Copies one chunk from 'stream' into the spool file at 'offset'. When
+    the client sent a SHA-256 of the chunk it is checked before the chunk
+    is marked as received; a bad chunk is simply sent again.
+    Returns the number of bytes written.
+    """
+    meta = _load_meta(upload_id)
+    _, spool_path, parts_dir = _upload_paths(upload_id)
+
+    if offset < 0 or offset % meta['chunk_size'] != 0 or offset >= meta['size']:
+        raise ValueError('Invalid chunk offset.')
+    max_length = min(meta['chunk_size'], meta['size'] - offset)
+
+    # A chunk sent again overwrites what is there, so it no longer counts
+    # as received until this copy has been checked.
+    marker_path = os.path.join(parts_dir, str(offset))
+    try:
+        os.remove(marker_path)
+    except FileNotFoundError:
+        pass
+
+    digest = hashlib.sha256()
+    written = 0
+    with open(spool_path, 'r+b') as spool:
+        spool.seek(offset)
+        while True:
+            block = stream.read(_COPY_BUFFER)
+            if not block:
+                break
+            written += len(block)
+            if written > max_length:
+                raise ValueError('Chunk is larger than expected.')
+            digest.update(block)
+            spool.write(block)
+
+    if written != max_length:
+        raise ValueError('Chunk is incomplete. Please send it again.')
+    if expected_sha256 and digest.hexdigest() != expected_sha256.lower():
+        raise ValueError('Chunk checksum mismatch. Please send it again.')
+
+    with open(marker_path, 'w') as marker:
+        marker.write(digest.hexdigest())
+    return written
+
+def upload_status(upload_id):
+    """
+    Describes an upload, including the offsets of the chunks received so
+    far and whether it is complete.
+    """
+    meta = _load_meta(upload_id)
+    _, _, parts_dir = _upload_paths(upload_id)
+    received = sorted(int(name) for name in os.listdir(parts_dir))
+    expected_chunks = -(-meta['size'] // meta['chunk_size'])
+    return dict(meta, received_offsets=received, complete=len(received) == expected_chunks)
+
+def finalize_upload(upload_id):
+    """
+    Checks that every chunk has arrived and returns (filename, spool_path)
+    for handing the file to one of the PDF operations.
+    """
+    status = upload_status(upload_id)
+    if not status['complete']:
+        raise ValueError(f"Upload of '{status['filename']}' is not complete yet.")
+    _, spool_path, _ = _upload_paths(upload_id)
+    return status['filename'], spool_path
+
+def discard_upload(upload_id):
+    """
+    Removes an upload's spool file and bookkeeping.
+    """
+    meta_path, spool_path, parts_dir = _upload_paths(upload_id)
+    for path in (meta_path, spool_path):
+        if os.path.exists(path):
+            os.remove(path)
+    shutil.rmtree(parts_dir, ignore_errors=True)
+
+def remove_expired_uploads(now=None):
+    """
+    Deletes uploads that haven't received a chunk for UPLOAD_MAX_AGE. Runs
+    at most once per CLEANUP_INTERVAL unless 'now' is given.
+    """
+    global _last_cleanup
+    current = now if now is not None else time.time()
+    if now is None and current - _last_cleanup < CLEANUP_INTERVAL:
+        return
+    _last_cleanup = current
+
+    try:
+        names = os.listdir(UPLOAD_DIR)
+    except FileNotFoundError:
+        return
+    upload_ids = {name.split('.')[0] for name in names if _UPLOAD_ID_PATTERN.match(name.split('.')[0])}
+    for upload_id in upload_ids:
+        # Every chunk write touches the spool file. An upload that is only
+        # partly there (being created or removed) goes by the files it has.
+        mtimes = []
+        for path in _upload_paths(upload_id):
+            try:
+                mtimes.append(os.path.getmtime(path))
+            except FileNotFoundError:
+                pass
+        if mtimes and current - max(mtimes) > UPLOAD_MAX_AGE:
+            discard_upload(upload_id)
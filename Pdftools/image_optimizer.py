@@ -0,0 +1,148 @@
+import os
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+import fitz  # PyMuPDF
+
+# Optional output-size stage: downsamples embedded images that are stored
+# at a higher resolution than they are shown at, and re-encodes them as
+# JPEG. Scanned books often carry 600-dpi page images; 150 dpi is plenty
+# for reading on a screen.
+
+# --- CONFIGURATION ---
+
+# 1. Images shown above this resolution are scaled down to it.
+TARGET_DPI = 150
+
+# 2. JPEG quality (0-100) for the re-encoded images.
+JPEG_QUALITY = 75
+
+# 3. Images smaller than this (in bytes) are not worth the effort.
+MIN_IMAGE_BYTES = 16 * 1024
+
+# --- WORKER (runs in a separate process) ---
+
+def _recompress_image(job):
+    """
+    Decodes one image, scales it and encodes it as JPEG. Returns the xref
+    with the new image description, or None when the image is left alone.
+    """
+    xref, image_bytes, scale, jpeg_quality, gray = job
+    try:
+        pix = fitz.Pixmap(image_bytes)
+        if pix.alpha:
+            pix = fitz.Pixmap(pix, 0)  # JPEG can't carry transparency
+        if gray and pix.n != 1:
+            pix = fitz.Pixmap(fitz.csGRAY, pix)  # e.g. an Indexed gray palette
+        elif pix.n not in (1, 3):
+            pix = fitz.Pixmap(fitz.csRGB, pix)  # e.g. CMYK scans
+        if scale < 1:
+            new_width = max(1, int(pix.width * scale))
+            new_height = max(1, int(pix.height * scale))
+            pix = fitz.Pixmap(pix, new_width, new_height, None)
+        jpeg_bytes = pix.tobytes('jpeg', jpg_quality=jpeg_quality)
+    except Exception:
+        return xref, None  # An image type we can't decode; keep the original
+
+    return xref, {
+        'stream': jpeg_bytes,
+        'width': pix.width,
+        'height': pix.height,
+        'colorspace': '/DeviceGray' if pix.n == 1 else '/DeviceRGB',
+    }
+
+# --- PLANNING ---
+
+def _effective_dpi(page, xref, pixel_width):
+    """
+    Returns the lowest resolution the image is shown at on this page (its
+    largest placement decides how much detail is needed), or None if the
+    image isn't actually drawn.
+    """
+    widths = [rect.width for rect in page.get_image_rects(xref) if rect.width > 0]
+    if not widths:
+        return None
+    return pixel_width / (max(widths) / 72)
+
+def _plan_jobs(doc, target_dpi, jpeg_quality):
+    """
+    Walks every page and decides which images to recompress. An image used
+    on many pages (a logo, a shared background) is planned once, at the
+    lowest resolution it is shown at anywhere. Returns the jobs and the
+    stored size of each image.
+    """
+    lowest_dpi = {}   # xref -> lowest effective dpi seen so far
+    skipped = set()   # xrefs we have already decided to leave alone
+
+    for page in doc:
+        for xref, smask, width, height, bpc, *_ in page.get_images(full=True):
+            if xref in skipped:
+                continue
+            # Masked images and 1-bit scans (fax/JBIG2) compress better as they
+            # are. A colour-key /Mask would no longer match JPEG's samples.
+            if smask or bpc != 8 or doc.xref_get_key(xref, 'Mask')[0] != 'null':
+                skipped.add(xref)
+                continue
+            dpi = _effective_dpi(page, xref, width)
+            if dpi is not None:
+                lowest_dpi[xref] = min(dpi, lowest_dpi.get(xref, dpi))
+
+    jobs = []
+    stored_sizes = {}  # xref -> size of the stream as stored in the file
+    for xref, dpi in lowest_dpi.items():
+        if dpi <= target_dpi:
+            continue
+        stored_sizes[xref] = len(doc.xref_stream_raw(xref))
+        if stored_sizes[xref] < MIN_IMAGE_BYTES:
+            continue
+        image = doc.extract_image(xref)
+        # extract_image() applies a /Decode array (e.g. the [1 0] of inverted
+        # scans) when it converts to PNG, but hands JPEG and JPEG 2000
+        # streams over as stored. Those would need the array re-applied, so
+        # they are left alone.
+        if image and image['ext'] != 'png' and doc.xref_get_key(xref, 'Decode')[0] != 'null':
+            continue
+        if image:
+            jobs.append((xref, image['image'], target_dpi / dpi, jpeg_quality, image['colorspace'] == 1))
+    return jobs, stored_sizes
+
+# --- MAIN ENTRY POINT ---
+
+def optimize_images(doc, target_dpi=TARGET_DPI, jpeg_quality=JPEG_QUALITY, workers=None):
+    """
+    Downsamples and recompresses the images of 'doc' in place. Decoding and
+    encoding run in parallel worker processes; the document itself is only
+    touched from this process. Returns a small report of what changed.
+    """
+    if target_dpi <= 0:
+        raise ValueError('The target resolution must be a positive number of dpi.')
+    jobs, original_sizes = _plan_jobs(doc, target_dpi, jpeg_quality)
+    report = {'images': 0, 'bytes_before': 0, 'bytes_after': 0}
+    if not jobs:
+        return report
+
+    workers = min(workers or os.cpu_count() or 1, len(jobs))
+    # Daemonic processes (e.g. some server workers) can't start a pool.
+    if workers > 1 and not multiprocessing.current_process().daemon:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(_recompress_image, jobs))
+    else:
+        results = [_recompress_image(job) for job in jobs]
+
+    for xref, new_image in results:
+        # Only swap the stream when it actually got smaller.
+        if new_image is None or len(new_image['stream']) >= original_sizes[xref]:
+            continue
+        doc.update_stream(xref, new_image['stream'], compress=False)
+        doc.xref_set_key(xref, 'Filter', '/DCTDecode')
+        doc.xref_set_key(xref, 'DecodeParms', 'null')
+        # Any /Decode array is already in the new samples (see _plan_jobs).
+        doc.xref_set_key(xref, 'Decode', 'null')
+        doc.xref_set_key(xref, 'Width', str(new_image['width']))
+        doc.xref_set_key(xref, 'Height', str(new_image['height']))
+        doc.xref_set_key(xref, 'ColorSpace', new_image['colorspace'])
+        doc.xref_set_key(xref, 'BitsPerComponent', '8')
+
+        report['images'] += 1
+        report['bytes_before'] += original_sizes[xref]
+        report['bytes_after'] += len(new_image['stream'])
+    return report
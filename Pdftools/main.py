@@ -1,11 +1,9 @@
-import os
-import re
 import io
-import zipfile
-from flask import Flask, request, render_template_string, send_file, flash
-import fitz  # PyMuPDF
-from reportlab.pdfgen import canvas
-from reportlab.lib.units import mm
+from flask import Flask, request, render_template, send_file, flash, session
+from jinja2 import DictLoader
+# pdf_operations pulls in fitz and reportlab, so it is imported inside the
+# routes that need it. That keeps cold starts (and the index page) fast.
+import admission
 
 # Initialize the Flask application
 app = Flask(__name__)
@@ -289,47 +287,42 @@ HTML_TEMPLATE = """
 </html>
 """
 
+# Jinja compiles the page once and caches it, instead of parsing the whole
+# string again on every request the way render_template_string does.
+app.jinja_loader = DictLoader({'index.html': HTML_TEMPLATE})
+
+# Without flashed messages the page is always the same, so it is rendered
+# once and then served from memory.
+_prerendered_index = None
+
 @app.route('/')
 def index():
-    return render_template_string(HTML_TEMPLATE)
+    global _prerendered_index
+    if '_flashes' in session:
+        return render_template('index.html')
+    if _prerendered_index is None:
+        _prerendered_index = render_template('index.html')
+    return _prerendered_index
 
 @app.route('/add_page_numbers', methods=['POST'])
 def add_page_numbers():
+    import pdf_operations
+
     if 'pdf_file' not in request.files or request.files['pdf_file'].filename == '':
         flash('No file was selected. Please upload a PDF.', 'error')
         return index()
 
     file = request.files['pdf_file']
     if file and file.filename.endswith('.pdf'):
-        original_pdf_bytes = file.read()
-        original_doc = fitz.open(stream=original_pdf_bytes, filetype="pdf")
-        
-        page_one = original_doc[0]
-        page_width, page_height = page_one.rect.width, page_one.rect.height
-
-        packet = io.BytesIO()
-        c = canvas.Canvas(packet, pagesize=(page_width, page_height))
-        for page_num in range(1, len(original_doc) + 1):
-            c.setFont("Helvetica", 12)
-            c.drawRightString(page_width - 20, 20, str(page_num))
-            c.showPage()
-        c.save()
-        
-        packet.seek(0)
-        numbers_pdf = fitz.open(stream=packet, filetype="pdf")
-
-        for i, page in enumerate(original_doc):
-            if i < len(numbers_pdf):
-                page.show_pdf_page(page.rect, numbers_pdf, i)
-
-        output_pdf_bytes = io.BytesIO()
-        original_doc.save(output_pdf_bytes)
-        original_doc.close()
-        numbers_pdf.close()
-        output_pdf_bytes.seek(0)
+        try:
+            numbered_pdf, _ = admission.run_limited(
+                request.remote_addr, pdf_operations.number_pdf_bytes, file.read())
+        except (admission.AdmissionError, pdf_operations.InvalidPDFError) as e:
+            flash(str(e), 'error')
+            return index()
 
         return send_file(
-            output_pdf_bytes,
+            io.BytesIO(numbered_pdf),
             as_attachment=True,
             download_name='numbered_document.pdf',
             mimetype='application/pdf'
@@ -340,6 +333,8 @@ def add_page_numbers():
 
 @app.route('/split_pdf', methods=['POST'])
 def split_pdf():
+    import pdf_operations
+
     if 'pdf_file' not in request.files or request.files['pdf_file'].filename == '':
         flash('No file was selected. Please upload a PDF.', 'error')
         return index()
@@ -352,49 +347,26 @@ def split_pdf():
         return index()
 
     if file and file.filename.endswith('.pdf'):
-        pdf_bytes = file.read()
-        original_doc = fitz.open(stream=pdf_bytes, filetype="pdf")
-        
         try:
-            zip_buffer = io.BytesIO()
-            with zipfile.ZipFile(zip_buffer, 'a', zipfile.ZIP_DEFLATED, False) as zip_file:
-                ranges = [r.strip() for r in page_ranges_str.split(',') if r.strip()]
-                for r in ranges:
-                    new_doc = fitz.open()
-                    pages_in_range = []
-                    if '-' in r:
-                        start, end = map(int, r.split('-'))
-                        pages_in_range = range(start - 1, end)
-                    else:
-                        pages_in_range = [int(r) - 1]
-                    
-                    for page_num in pages_in_range:
-                        if 0 <= page_num < len(original_doc):
-                            new_doc.insert_pdf(original_doc, from_page=page_num, to_page=page_num)
-                    
-                    if len(new_doc) > 0:
-                        pdf_buffer = io.BytesIO()
-                        new_doc.save(pdf_buffer)
-                        pdf_buffer.seek(0)
-                        zip_file.writestr(f'split_pages_{r}.pdf', pdf_buffer.getvalue())
-                    new_doc.close()
-
-            original_doc.close()
-
-            if len(zip_file.infolist()) == 0:
-                flash('The specified page ranges are not valid for this document.', 'error')
-                return index()
-
-            zip_buffer.seek(0)
-            return send_file(
-                zip_buffer,
-                as_attachment=True,
-                download_name='split_documents.zip',
-                mimetype='application/zip'
-            )
+            parts, _ = admission.run_limited(
+                request.remote_addr, pdf_operations.split_pdf_bytes, file.read(), page_ranges_str)
+        except (admission.AdmissionError, pdf_operations.InvalidPDFError) as e:
+            flash(str(e), 'error')
+            return index()
         except ValueError:
             flash('Invalid page range format. Please use formats like "1-3, 5, 8-10".', 'error')
             return index()
+
+        if not parts:
+            flash('The specified page ranges are not valid for this document.', 'error')
+            return index()
+
+        return send_file(
+            io.BytesIO(pdf_operations.zip_files(parts)),
+            as_attachment=True,
+            download_name='split_documents.zip',
+            mimetype='application/zip'
+        )
     
     flash('Invalid file type. Please upload a PDF.', 'error')
     return index()
@@ -0,0 +1,321 @@
+import io
+import os
+import json
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from quart import Quart, request, render_template, send_file, flash, jsonify, abort, url_for, session
+from jinja2 import DictLoader
+import admission
+import chunked_uploads
+import output_profiles
+import output_store
+from web_common import HTML_TEMPLATE, read_finished_upload, discard_uploads, requested_output_profile, \
+    requested_image_dpi
+
+# The same toolkit as main2.py, served by asyncio (Quart) instead of WSGI
+# threads. Upload bodies are received by the event loop, so a slow phone
+# connection costs a coroutine instead of a whole worker thread. The PDF
+# work itself runs in one limited process per job (see admission.py) and
+# responses are streamed from disk.
+#
+# Start it with:
+#   python main_async.py
+# which serves on port 8000 with Hypercorn. Running 'hypercorn main_async:app'
+# also works, but Hypercorn's worker processes may not start processes of
+# their own, so PDF jobs then run in-process without the CPU and memory
+# limits.
+
+# Initialize the Quart application
+app = Quart(__name__)
+app.config['SECRET_KEY'] = 'a-very-secret-key-for-a-cool-app'
+
+# Slow mobile uploads need more than Quart's 60 second default, and big
+# PDFs more than its 16 MB default body size.
+app.config['BODY_TIMEOUT'] = 15 * 60
+app.config['MAX_CONTENT_LENGTH'] = admission.MAX_REQUEST_BYTES
+
+# PDF jobs wait in their thread for a slot and then for the job process,
+# for minutes at worst. They get threads of their own, one per job that
+# admission lets in, so they never hold up the default executor that the
+# upload and file handling below runs on.
+_pdf_job_threads = ThreadPoolExecutor(max_workers=admission.MAX_CONCURRENT_JOBS + admission.MAX_WAITING_JOBS,
+                                      thread_name_prefix='pdf-job')
+
+async def run_pdf_job(func, pdf_input, *args):
+    """
+    Runs a pdf_operations function through admission.run_limited without
+    blocking the event loop. Raises admission.AdmissionError when refused.
+    """
+    job = functools.partial(admission.run_limited, request.remote_addr, func, pdf_input, *args)
+    return await asyncio.get_running_loop().run_in_executor(_pdf_job_threads, job)
+
+# The page is compiled once; without flashed messages it is served pre-rendered.
+app.jinja_loader = DictLoader({'index.html': HTML_TEMPLATE})
+_prerendered_index = None
+
+@app.route('/')
+async def index():
+    global _prerendered_index
+    if '_flashes' in session:
+        return await render_template('index.html', output_profiles=output_profiles.OUTPUT_PROFILES)
+    if _prerendered_index is None:
+        _prerendered_index = await render_template('index.html', output_profiles=output_profiles.OUTPUT_PROFILES)
+    return _prerendered_index
+
+# --- CHUNKED UPLOAD API ---
+
+@app.route('/uploads', methods=['POST'])
+async def create_upload():
+    payload = await request.get_json(silent=True) or {}
+    size = payload.get('size')
+    if isinstance(size, int) and size > admission.MAX_INPUT_BYTES:
+        return jsonify(error=f'Files larger than {admission.MAX_INPUT_BYTES // (1024 * 1024)} MB are not accepted.'), 413
+    try:
+        upload = await asyncio.to_thread(
+            chunked_uploads.create_upload, payload.get('filename'), payload.get('size'))
+    except ValueError as e:
+        return jsonify(error=str(e)), 400
+    return jsonify(upload), 201
+
+@app.route('/uploads/<upload_id>', methods=['GET'])
+async def upload_status(upload_id):
+    try:
+        return jsonify(await asyncio.to_thread(chunked_uploads.upload_status, upload_id))
+    except ValueError as e:
+        return jsonify(error=str(e)), 404
+
+@app.route('/uploads/<upload_id>/chunks', methods=['PUT'])
+async def upload_chunk(upload_id):
+    offset = request.args.get('offset', type=int)
+    if offset is None:
+        return jsonify(error='Chunk offset was not provided.'), 400
+
+    # One chunk is at most CHUNK_SIZE bytes; the event loop collects it
+    # while other requests carry on.
+    body = await request.get_data()
+    try:
+        written = await asyncio.to_thread(
+            chunked_uploads.write_chunk, upload_id, offset, io.BytesIO(body),
+            request.headers.get('X-Chunk-SHA256'))
+    except ValueError as e:
+        return jsonify(error=str(e)), 400
+    return jsonify(offset=offset, received=written)
+
+async def single_pdf_input(form, files):
+    """
+    Returns (filename, pdf_bytes) for the one-file tools, taken either from
+    the 'pdf_file' form field or from a chunked upload named by 'upload_id'.
+    Returns None when neither was sent.
+    """
+    upload_id = form.get('upload_id')
+    if upload_id:
+        return await asyncio.to_thread(read_finished_upload, upload_id)
+
+    file = files.get('pdf_file')
+    if not file or file.filename == '':
+        return None
+    return file.filename, await asyncio.to_thread(file.read)
+
+# --- SENDING RESULTS ---
+
+async def send_stored_output(stored_name, download_name):
+    """
+    Streams a stored output file, answering Range, If-None-Match and
+    If-Modified-Since requests.
+    """
+    path = output_store.stored_output_path(stored_name)
+    if path is None:
+        abort(404)
+    response = await send_file(
+        path,
+        as_attachment=True,
+        attachment_filename=download_name,
+        add_etags=False,
+        cache_timeout=output_store.OUTPUT_MAX_AGE
+    )
+    response.set_etag(stored_name.split('.')[0])
+    await response.make_conditional(request, accept_ranges=True, complete_length=os.path.getsize(path))
+    return response
+
+@app.route('/outputs/<stored_name>/<download_name>', methods=['GET'])
+async def download_output(stored_name, download_name):
+    return await send_stored_output(stored_name, download_name)
+
+async def send_output(data, report, download_name, mimetype):
+    """
+    Stores a generated file under its content hash and streams it back.
+    See main2.send_output for the headers.
+    """
+    app.logger.info('%s: profile=%s size=%d save=%.3fs linearized=%s', download_name,
+                    report['profile'], report['size'], report['seconds'], report['linearized'])
+    extension = 'zip' if mimetype == 'application/zip' else 'pdf'
+    stored_name = await asyncio.to_thread(output_store.store_output, data, extension)
+    response = await send_stored_output(stored_name, download_name)
+    response.headers['Content-Location'] = url_for(
+        'download_output', stored_name=stored_name, download_name=download_name)
+    response.headers['X-Output-Profile'] = report['profile']
+    response.headers['X-Output-Size'] = str(report['size'])
+    response.headers['X-Output-Save-Seconds'] = str(report['seconds'])
+    response.headers['X-Output-Linearized'] = 'yes' if report['linearized'] else 'no'
+    return response
+
+# --- PDF TOOLS ---
+
+@app.route('/merge_pdfs', methods=['POST'])
+async def merge_pdfs():
+    import pdf_operations
+
+    form = await request.form
+    files = [f for f in (await request.files).getlist("pdf_files") if f.filename]
+    upload_ids = form.getlist("upload_ids")
+
+    if len(files) + len(upload_ids) < 2:
+        await flash('Please upload at least two PDF files to merge.', 'error')
+        return await index()
+
+    try:
+        profile = requested_output_profile(form)
+        image_dpi = requested_image_dpi(form)
+    except ValueError as e:
+        await flash(str(e), 'error')
+        return await index()
+
+    pdf_bytes_list = []
+    for file in files:
+        if file and file.filename.endswith('.pdf'):
+            pdf_bytes_list.append(await asyncio.to_thread(file.read))
+        else:
+            await flash(f'Skipped non-PDF file: {file.filename}', 'error')
+
+    for upload_id in upload_ids:
+        try:
+            pdf_bytes_list.append((await asyncio.to_thread(read_finished_upload, upload_id))[1])
+        except ValueError as e:
+            await flash(str(e), 'error')
+            return await index()
+
+    try:
+        merged_pdf, report = await run_pdf_job(pdf_operations.merge_pdf_bytes, pdf_bytes_list, profile, image_dpi)
+    except (admission.AdmissionError, pdf_operations.InvalidPDFError) as e:
+        await flash(str(e), 'error')
+        return await index()
+    if merged_pdf is None:
+        await flash('No valid PDFs were provided to merge.', 'error')
+        return await index()
+
+    await asyncio.to_thread(discard_uploads, upload_ids)
+    return await send_output(merged_pdf, report, 'merged_document.pdf', 'application/pdf')
+
+@app.route('/add_page_numbers', methods=['POST'])
+async def add_page_numbers():
+    import pdf_operations
+
+    form = await request.form
+    try:
+        profile = requested_output_profile(form)
+        pdf_input = await single_pdf_input(form, await request.files)
+    except ValueError as e:
+        await flash(str(e), 'error')
+        return await index()
+
+    if pdf_input is None:
+        await flash('No file was selected. Please upload a PDF.', 'error')
+        return await index()
+
+    filename, pdf_bytes = pdf_input
+    if filename.endswith('.pdf'):
+        try:
+            numbered_pdf, report = await run_pdf_job(pdf_operations.number_pdf_bytes, pdf_bytes, profile)
+        except (admission.AdmissionError, pdf_operations.InvalidPDFError) as e:
+            await flash(str(e), 'error')
+            return await index()
+        await asyncio.to_thread(discard_uploads, [form.get('upload_id')])
+        return await send_output(numbered_pdf, report, 'numbered_document.pdf', 'application/pdf')
+
+    await flash('Invalid file type. Please upload a PDF.', 'error')
+    return await index()
+
+@app.route('/split_pdf', methods=['POST'])
+async def split_pdf():
+    import pdf_operations
+
+    form = await request.form
+    files = await request.files
+    page_ranges_str = form.get('page_ranges')
+    if not page_ranges_str and (form.get('upload_id') or files.get('pdf_file')):
+        await flash('Page ranges were not provided.', 'error')
+        return await index()
+
+    try:
+        profile = requested_output_profile(form)
+        pdf_input = await single_pdf_input(form, files)
+    except ValueError as e:
+        await flash(str(e), 'error')
+        return await index()
+
+    if pdf_input is None:
+        await flash('No file was selected. Please upload a PDF.', 'error')
+        return await index()
+
+    filename, pdf_bytes = pdf_input
+    if filename.endswith('.pdf'):
+        try:
+            parts, report = await run_pdf_job(pdf_operations.split_pdf_bytes, pdf_bytes, page_ranges_str, profile)
+        except (admission.AdmissionError, pdf_operations.InvalidPDFError) as e:
+            await flash(str(e), 'error')
+            return await index()
+        except ValueError:
+            await flash('Invalid page range format. Please use formats like "1-3, 5, 8-10".', 'error')
+            return await index()
+
+        if not parts:
+            await flash('The specified page ranges are not valid for this document.', 'error')
+            return await index()
+
+        await asyncio.to_thread(discard_uploads, [form.get('upload_id')])
+        zip_bytes = await asyncio.to_thread(pdf_operations.zip_files, parts)
+        return await send_output(zip_bytes, report, 'split_documents.zip', 'application/zip')
+
+    await flash('Invalid file type. Please upload a PDF.', 'error')
+    return await index()
+
+@app.route('/pipeline', methods=['POST'])
+async def pipeline():
+    """
+    Runs an ordered list of operations on the uploaded PDFs in one go.
+    See main2.pipeline for the form fields.
+    """
+    import pdf_operations
+
+    form = await request.form
+    files = await request.files
+    try:
+        profile = requested_output_profile(form)
+        operations = json.loads(form.get('operations') or 'null')
+        pdf_bytes_list = [await asyncio.to_thread(file.read)
+                          for file in files.getlist('pdf_files') if file.filename]
+        for upload_id in form.getlist('upload_ids'):
+            pdf_bytes_list.append((await asyncio.to_thread(read_finished_upload, upload_id))[1])
+        if not pdf_bytes_list:
+            raise ValueError('No file was selected. Please upload a PDF.')
+        output_pdf, report = await run_pdf_job(pdf_operations.run_pipeline, pdf_bytes_list, operations, profile)
+    except admission.BusyError as e:
+        return jsonify(error=str(e)), 429
+    except admission.AdmissionError as e:
+        return jsonify(error=str(e)), 413
+    except json.JSONDecodeError:
+        return jsonify(error='The operations field must be valid JSON.'), 400
+    except ValueError as e:
+        return jsonify(error=str(e)), 400
+
+    await asyncio.to_thread(discard_uploads, form.getlist('upload_ids'))
+    return await send_output(output_pdf, report, 'pipeline_document.pdf', 'application/pdf')
+
+if __name__ == '__main__':
+    from hypercorn.asyncio import serve
+    from hypercorn.config import Config
+
+    config = Config()
+    config.bind = [os.environ.get('BIND', '0.0.0.0:8000')]
+    asyncio.run(serve(app, config))
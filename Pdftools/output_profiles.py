@@ -0,0 +1,134 @@
+import io
+import os
+import glob
+import time
+import tempfile
+
+# Named sets of save options for every PDF the tools write. Pick one per
+# route, per CLI run or in main.py's configuration, and compare the size
+# and save time each one reports on your own documents.
+
+# --- PROFILES ---
+
+OUTPUT_PROFILES = {
+    # Plain save, the way the web tools have always written files.
+    'default': {},
+    # Drops unused objects and compresses streams. Good general choice.
+    'clean': {'garbage': 4, 'deflate': True, 'clean': True},
+    # Smallest files: also compresses images and fonts and packs objects
+    # into object streams. Slowest to write.
+    'compact': {'garbage': 4, 'deflate': True, 'deflate_images': True,
+                'deflate_fonts': True, 'use_objstms': 1, 'clean': True},
+    # Linearized ("fast web view") so viewers can show page one before the
+    # whole file has arrived. Linearization can't be combined with object
+    # streams, so those are left off here.
+    'web': {'garbage': 4, 'deflate': True, 'deflate_images': True,
+            'deflate_fonts': True, 'linear': True},
+}
+
+DEFAULT_PROFILE = 'default'
+
+_linearization_supported = None  # See linearization_supported()
+
+# --- SAVING ---
+
+def check_profile(profile):
+    """
+    Returns the profile name if it is known, otherwise raises ValueError.
+    """
+    if profile not in OUTPUT_PROFILES:
+        raise ValueError(f"Unknown output profile '{profile}'. Choose one of: {', '.join(OUTPUT_PROFILES)}.")
+    return profile
+
+def save_atomically(doc, path, options):
+    """
+    Saves to a hidden temporary file next to 'path', flushes it to disk
+    and renames it into place. If we are killed halfway, 'path' is either
+    the old file or the complete new one, never half a PDF. A leftover
+    temporary file is named '.<name>.<random>.tmp'.
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    prefix = f'.{os.path.basename(path)}.'
+    # Clear away what an earlier, killed save of this file left behind.
+    for stale_path in glob.glob(os.path.join(glob.escape(directory), glob.escape(prefix) + '*.tmp')):
+        os.remove(stale_path)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=prefix, suffix='.tmp')
+    os.close(fd)
+    try:
+        doc.save(tmp_path, **options)
+        with open(tmp_path, 'rb+') as f:
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except FileNotFoundError:
+            pass
+        raise
+
+    # Make the rename itself survive a power cut (not possible on Windows).
+    if hasattr(os, 'O_DIRECTORY'):
+        dir_fd = os.open(directory, os.O_RDONLY | os.O_DIRECTORY)
+        try:
+            os.fsync(dir_fd)
+        finally:
+            os.close(dir_fd)
+
+def linearization_supported():
+    """
+    True if this MuPDF can still write linearized files. Found out once,
+    by saving a one-page document, and remembered.
+    """
+    global _linearization_supported
+    if _linearization_supported is None:
+        import fitz  # PyMuPDF
+        probe = fitz.open()
+        probe.new_page()
+        try:
+            probe.save(io.BytesIO(), linear=True)
+            _linearization_supported = True
+        except Exception:
+            _linearization_supported = False
+        finally:
+            probe.close()
+    return _linearization_supported
+
+def save_document(doc, target, profile=DEFAULT_PROFILE):
+    """
+    Saves a fitz document to a file path or a binary stream using the
+    named profile. Returns a report with the size and save time. Files
+    are written atomically (see save_atomically).
+
+    Newer MuPDF releases no longer write linearized files. In that case
+    the file is saved with the rest of the profile's options and the
+    report says 'linearized': False.
+    """
+    options = dict(OUTPUT_PROFILES[check_profile(profile)])
+    if options.get('linear') and not linearization_supported():
+        options.pop('linear')
+    linearized = options.get('linear', False)
+
+    started = time.perf_counter()
+    if isinstance(target, io.BytesIO):
+        doc.save(target, **options)
+    else:
+        save_atomically(doc, target, options)
+    seconds = time.perf_counter() - started
+
+    if isinstance(target, io.BytesIO):
+        size = target.getbuffer().nbytes
+    else:
+        size = os.path.getsize(target)
+
+    return {'profile': profile, 'size': size, 'seconds': round(seconds, 3), 'linearized': linearized}
+
+def combine_reports(reports, profile=DEFAULT_PROFILE):
+    """
+    Adds up the reports of several saves (e.g. the parts of a split).
+    """
+    return {
+        'profile': profile,
+        'size': sum(r['size'] for r in reports),
+        'seconds': round(sum(r['seconds'] for r in reports), 3),
+        'linearized': bool(reports) and all(r['linearized'] for r in reports),
+    }
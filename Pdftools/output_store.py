@@ -0,0 +1,82 @@
+import os
+import re
+import time
+import hashlib
+import tempfile
+
+# Generated files are kept on disk under the SHA-256 of their content for
+# a while after they are made. Serving them from a real file (instead of a
+# one-shot in-memory stream) lets Flask answer Range requests and ETag /
+# Last-Modified revalidation, so a PDF viewer can fetch pages as it needs
+# them and an interrupted download can pick up where it stopped.
+
+# --- CONFIGURATION ---
+
+# 1. Where generated files are kept.
+OUTPUT_DIR = os.environ.get('PDF_OUTPUT_DIR', os.path.join(tempfile.gettempdir(), 'pdf_toolkit_outputs'))
+
+# 2. How long (in seconds) a generated file stays downloadable.
+OUTPUT_MAX_AGE = 24 * 60 * 60
+
+# 3. How often (in seconds) we look for expired files.
+CLEANUP_INTERVAL = 10 * 60
+
+_STORED_NAME_PATTERN = re.compile(r'^[0-9a-f]{64}\.(pdf|zip)$')
+_last_cleanup = 0.0
+
+# --- API ---
+
+def store_output(data, extension):
+    """
+    Saves generated bytes under their content hash and returns the stored
+    name (e.g. '3fa1...c9.pdf'). Identical outputs share one file.
+    """
+    os.makedirs(OUTPUT_DIR, exist_ok=True)
+    stored_name = f'{hashlib.sha256(data).hexdigest()}.{extension}'
+    path = os.path.join(OUTPUT_DIR, stored_name)
+
+    # Expire old files first, then mark a reused one as fresh, so the
+    # cleanup can't delete a file we are about to hand out.
+    remove_expired_outputs()
+    try:
+        os.utime(path)
+    except FileNotFoundError:
+        # Write to a temporary name first so readers never see half a file.
+        fd, tmp_path = tempfile.mkstemp(dir=OUTPUT_DIR, suffix='.tmp')
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+    return stored_name
+
+def stored_output_path(stored_name):
+    """
+    Returns the path of a stored output, or None if the name is not one of
+    ours or the file has expired.
+    """
+    if not _STORED_NAME_PATTERN.match(stored_name or ''):
+        return None
+    path = os.path.join(OUTPUT_DIR, stored_name)
+    return path if os.path.isfile(path) else None
+
+def remove_expired_outputs(now=None):
+    """
+    Deletes stored outputs older than OUTPUT_MAX_AGE. Runs at most once
+    per CLEANUP_INTERVAL unless 'now' is given.
+    """
+    global _last_cleanup
+    current = now if now is not None else time.time()
+    if now is None and current - _last_cleanup < CLEANUP_INTERVAL:
+        return
+    _last_cleanup = current
+
+    try:
+        entries = list(os.scandir(OUTPUT_DIR))
+    except FileNotFoundError:
+        return
+    for entry in entries:
+        try:
+            if current - entry.stat().st_mtime > OUTPUT_MAX_AGE:
+                os.remove(entry.path)
+        except FileNotFoundError:
+            pass  # Another worker got there first
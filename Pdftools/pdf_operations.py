@@ -0,0 +1,270 @@
+import io
+import zipfile
+import fitz  # PyMuPDF
+from reportlab.pdfgen import canvas
+from output_profiles import DEFAULT_PROFILE, save_document, combine_reports
+from image_optimizer import optimize_images
+
+# The document operations behind the web routes and the batch CLI.
+# Everything here works on plain bytes or fitz documents, so it can be
+# used without a Flask request in sight.
+
+# --- OPENING AND SAVING ---
+
+class InvalidPDFError(ValueError):
+    """
+    Raised when an input is not a PDF we can read. The message is meant
+    for the user.
+    """
+
+def open_pdf(pdf_bytes):
+    """
+    Opens PDF bytes as an in-memory fitz document. Raises InvalidPDFError
+    for empty or damaged files.
+    """
+    try:
+        return fitz.open(stream=pdf_bytes, filetype="pdf")
+    except Exception:
+        raise InvalidPDFError('One of the files is not a readable PDF.')
+
+def document_to_bytes(doc, profile=DEFAULT_PROFILE):
+    """
+    Serializes a fitz document with an output profile. Returns the PDF
+    bytes and the save report.
+    """
+    output_pdf_bytes = io.BytesIO()
+    report = save_document(doc, output_pdf_bytes, profile)
+    return output_pdf_bytes.getvalue(), report
+
+# --- MERGE ---
+
+def merge_documents(docs):
+    """
+    Appends every document in 'docs' (in order) to a new document.
+    """
+    merged_doc = fitz.open()
+    for doc_to_append in docs:
+        merged_doc.insert_pdf(doc_to_append)
+    return merged_doc
+
+def merge_pdf_bytes(pdf_bytes_list, profile=DEFAULT_PROFILE, image_dpi=None):
+    """
+    Merges a list of PDF byte strings into one PDF. Returns its bytes and
+    the save report, or (None, None) when there was nothing to merge.
+    With 'image_dpi', images shown above that resolution are downsampled.
+    """
+    merged_doc = fitz.open()
+    for pdf_bytes in pdf_bytes_list:
+        doc_to_append = open_pdf(pdf_bytes)
+        merged_doc.insert_pdf(doc_to_append)
+        doc_to_append.close()
+
+    if len(merged_doc) == 0:
+        merged_doc.close()
+        return None, None
+
+    if image_dpi:
+        optimize_images(merged_doc, target_dpi=image_dpi)
+
+    output = document_to_bytes(merged_doc, profile)
+    merged_doc.close()
+    return output
+
+# --- PAGE NUMBERS ---
+
+def add_page_numbers_to_document(doc):
+    """
+    Stamps a page number in the bottom-right corner of every page, in place.
+    """
+    page_one = doc[0]
+    page_width, page_height = page_one.rect.width, page_one.rect.height
+
+    packet = io.BytesIO()
+    c = canvas.Canvas(packet, pagesize=(page_width, page_height))
+    for page_num in range(1, len(doc) + 1):
+        c.setFont("Helvetica", 12)
+        c.drawRightString(page_width - 20, 20, str(page_num))
+        c.showPage()
+    c.save()
+
+    packet.seek(0)
+    numbers_pdf = fitz.open(stream=packet, filetype="pdf")
+
+    for i, page in enumerate(doc):
+        if i < len(numbers_pdf):
+            page.show_pdf_page(page.rect, numbers_pdf, i)
+
+    numbers_pdf.close()
+    return doc
+
+def number_pdf_bytes(pdf_bytes, profile=DEFAULT_PROFILE):
+    """
+    Adds page numbers to a PDF. Returns the new PDF bytes and the save report.
+    """
+    original_doc = open_pdf(pdf_bytes)
+    add_page_numbers_to_document(original_doc)
+    output = document_to_bytes(original_doc, profile)
+    original_doc.close()
+    return output
+
+# --- SPLIT ---
+
+def parse_page_ranges(page_ranges_str):
+    """
+    Turns a string like "1-3, 5, 8-10" into a list of (label, page_indices)
+    pairs. Page indices are zero-based. Raises ValueError on bad input.
+    """
+    parsed = []
+    ranges = [r.strip() for r in page_ranges_str.split(',') if r.strip()]
+    for r in ranges:
+        if '-' in r:
+            start, end = map(int, r.split('-'))
+            pages_in_range = range(start - 1, end)
+        else:
+            pages_in_range = [int(r) - 1]
+        parsed.append((r, pages_in_range))
+    return parsed
+
+def split_document(doc, page_ranges_str):
+    """
+    Builds one new document per page range. Ranges that select no valid
+    pages are left out. Returns a list of (label, fitz document) pairs.
+    """
+    parts = []
+    for label, pages_in_range in parse_page_ranges(page_ranges_str):
+        new_doc = fitz.open()
+        for page_num in pages_in_range:
+            if 0 <= page_num < len(doc):
+                new_doc.insert_pdf(doc, from_page=page_num, to_page=page_num)
+
+        if len(new_doc) > 0:
+            parts.append((label, new_doc))
+        else:
+            new_doc.close()
+    return parts
+
+def split_pdf_bytes(pdf_bytes, page_ranges_str, profile=DEFAULT_PROFILE):
+    """
+    Splits a PDF by page ranges. Returns a list of (filename, pdf_bytes)
+    pairs, one per range that selected at least one page, and a combined
+    save report for all the parts.
+    """
+    original_doc = open_pdf(pdf_bytes)
+    try:
+        parts = []
+        reports = []
+        for label, part_doc in split_document(original_doc, page_ranges_str):
+            part_bytes, report = document_to_bytes(part_doc, profile)
+            parts.append((f'split_pages_{label}.pdf', part_bytes))
+            reports.append(report)
+            part_doc.close()
+        return parts, combine_reports(reports, profile)
+    finally:
+        original_doc.close()
+
+def zip_files(named_files):
+    """
+    Packs (filename, bytes) pairs into a ZIP archive and returns its bytes.
+    """
+    zip_buffer = io.BytesIO()
+    with zipfile.ZipFile(zip_buffer, 'a', zipfile.ZIP_DEFLATED, False) as zip_file:
+        for filename, data in named_files:
+            zip_file.writestr(filename, data)
+    return zip_buffer.getvalue()
+
+# --- PIPELINE ---
+
+# The steps a pipeline can run, with the options each one takes.
+PIPELINE_OPERATIONS = {
+    'select_pages': ('ranges',),            # keep only these pages, in this order
+    'add_page_numbers': (),
+    'merge': ('inputs', 'position'),        # append (or prepend) other inputs
+    'optimize_images': ('dpi',),
+}
+
+def check_pipeline(operations, input_count):
+    """
+    Validates a list of pipeline steps before any PDF is opened. Raises
+    ValueError with a message that can be shown to the user.
+    """
+    if not isinstance(operations, list) or not operations:
+        raise ValueError('The pipeline needs a list of at least one operation.')
+
+    for number, step in enumerate(operations, start=1):
+        name = step.get('op') if isinstance(step, dict) else None
+        if name not in PIPELINE_OPERATIONS:
+            raise ValueError(f"Step {number}: unknown operation '{name}'. "
+                             f"Choose one of: {', '.join(PIPELINE_OPERATIONS)}.")
+        unknown = set(step) - {'op'} - set(PIPELINE_OPERATIONS[name])
+        if unknown:
+            raise ValueError(f"Step {number}: unexpected option(s) {', '.join(sorted(unknown))} for '{name}'.")
+
+        if name == 'select_pages':
+            if not str(step.get('ranges', '')).strip():
+                raise ValueError(f"Step {number}: 'select_pages' needs page ranges.")
+            try:
+                parse_page_ranges(str(step['ranges']))
+            except ValueError:
+                raise ValueError(f'Step {number}: invalid page range format. Please use formats like "1-3, 5, 8-10".')
+        elif name == 'merge':
+            inputs = step.get('inputs')
+            if not isinstance(inputs, list) or not inputs:
+                raise ValueError(f"Step {number}: 'merge' needs a list of input numbers.")
+            if input_count < 2:
+                raise ValueError(f"Step {number}: 'merge' needs at least two uploaded PDFs.")
+            # Input 0 is the document being built, so it can't be merged into itself.
+            if any(not isinstance(i, int) or not 0 < i < input_count for i in inputs):
+                raise ValueError(f"Step {number}: merge inputs must be between 1 and {input_count - 1}.")
+            if step.get('position', 'end') not in ('start', 'end'):
+                raise ValueError(f"Step {number}: merge position must be 'start' or 'end'.")
+        elif name == 'optimize_images':
+            if not isinstance(step.get('dpi'), int) or step['dpi'] <= 0:
+                raise ValueError(f"Step {number}: 'optimize_images' needs a positive 'dpi'.")
+
+def run_pipeline(pdf_bytes_list, operations, profile=DEFAULT_PROFILE):
+    """
+    Runs several operations in one pass. Every input is opened once; the
+    first one is the working document and each step changes it in memory.
+    Only the final result is saved. Returns the PDF bytes and save report.
+
+    Example (pick pages, number them, put a cover in front):
+        [{'op': 'select_pages', 'ranges': '3-40'},
+         {'op': 'add_page_numbers'},
+         {'op': 'merge', 'inputs': [1], 'position': 'start'}]
+    """
+    check_pipeline(operations, len(pdf_bytes_list))
+
+    docs = []
+    try:
+        for number, pdf_bytes in enumerate(pdf_bytes_list):
+            try:
+                docs.append(open_pdf(pdf_bytes))
+            except InvalidPDFError:
+                raise InvalidPDFError(f'Input {number} is not a readable PDF.')
+        working_doc = docs[0]
+
+        for step in operations:
+            name = step['op']
+            if name == 'select_pages':
+                keep = [page_num
+                        for _, pages_in_range in parse_page_ranges(step['ranges'])
+                        for page_num in pages_in_range
+                        if 0 <= page_num < len(working_doc)]
+                if not keep:
+                    raise ValueError('The specified page ranges are not valid for this document.')
+                working_doc.select(keep)
+            elif name == 'add_page_numbers':
+                add_page_numbers_to_document(working_doc)
+            elif name == 'merge':
+                insert_at = 0 if step.get('position', 'end') == 'start' else -1
+                for i in step['inputs']:
+                    working_doc.insert_pdf(docs[i], start_at=insert_at)
+                    if insert_at != -1:
+                        insert_at += len(docs[i])
+            elif name == 'optimize_images':
+                optimize_images(working_doc, target_dpi=step['dpi'])
+
+        return document_to_bytes(working_doc, profile)
+    finally:
+        for doc in docs:
+            doc.close()
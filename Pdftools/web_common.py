@@ -0,0 +1,492 @@
+import chunked_uploads
+import output_profiles
+
+# What the Flask app (main2.py) and the Quart app (main_async.py) share:
+# the page itself and the small helpers that don't depend on the framework.
+# Both apps read the form and run blocking calls in their own way, so these
+# take plain values instead of reaching for a request object.
+
+# The entire frontend is packed into this single string.
+HTML_TEMPLATE = """
+<!DOCTYPE html>
+<html lang="en">
+<head>
+    <meta charset="UTF-8">
+    <meta name="viewport" content="width=device-width, initial-scale=1.0">
+    <title>Professional PDF Toolkit</title>
+    <link rel="preconnect" href="https://fonts.googleapis.com">
+    <link rel="preconnect" href="https://fonts.gstatic.com" crossorigin>
+    <link href="https://fonts.googleapis.com/css2?family=Poppins:wght@400;600;700&display=swap" rel="stylesheet">
+    <style>
+        :root {
+            --primary-color: #007bff;
+            --primary-hover: #0056b3;
+            --background-color: #f8f9fa;
+            --card-background: #ffffff;
+            --text-color: #343a40;
+            --border-color: #dee2e6;
+            --success-bg: #d1e7dd;
+            --success-text: #0a3622;
+            --error-bg: #f8d7da;
+            --error-text: #842029;
+        }
+        body {
+            font-family: 'Poppins', sans-serif;
+            margin: 0;
+            padding: 2rem 1rem;
+            background-color: var(--background-color);
+            color: var(--text-color);
+            display: flex;
+            justify-content: center;
+            align-items: flex-start;
+            min-height: 100vh;
+        }
+        .container {
+            max-width: 700px;
+            width: 100%;
+        }
+        .header {
+            text-align: center;
+            margin-bottom: 2.5rem;
+        }
+        .header h1 {
+            font-size: 2.5rem;
+            font-weight: 700;
+            color: var(--primary-color);
+            margin: 0;
+        }
+        .header p {
+            font-size: 1.1rem;
+            color: #6c757d;
+        }
+        .tool-card {
+            background-color: var(--card-background);
+            border-radius: 12px;
+            border: 1px solid var(--border-color);
+            box-shadow: 0 8px 24px rgba(0, 0, 0, 0.05);
+            padding: 2.5rem;
+            margin-bottom: 2rem;
+            transition: transform 0.2s ease-in-out;
+        }
+        .tool-card:hover {
+            transform: translateY(-5px);
+        }
+        .tool-card h2 {
+            margin-top: 0;
+            font-size: 1.75rem;
+            font-weight: 600;
+            border-bottom: 1px solid var(--border-color);
+            padding-bottom: 1rem;
+            margin-bottom: 1.5rem;
+        }
+        .form-group {
+            margin-bottom: 1.5rem;
+        }
+        .form-group label {
+            display: block;
+            margin-bottom: 0.75rem;
+            font-weight: 600;
+            font-size: 1rem;
+        }
+        .form-control {
+            width: 100%;
+            padding: 0.75rem 1rem;
+            border-radius: 8px;
+            border: 1px solid #ced4da;
+            box-sizing: border-box;
+            font-family: 'Poppins', sans-serif;
+            font-size: 1rem;
+            transition: border-color 0.2s, box-shadow 0.2s;
+        }
+        .form-control:focus {
+            border-color: var(--primary-color);
+            outline: 0;
+            box-shadow: 0 0 0 0.25rem rgba(0, 123, 255, 0.25);
+        }
+        .file-upload-wrapper {
+            position: relative;
+            overflow: hidden;
+            display: flex;
+        }
+        .file-upload-input {
+            position: absolute;
+            left: 0;
+            top: 0;
+            opacity: 0;
+            width: 100%;
+            height: 100%;
+            cursor: pointer;
+        }
+        .file-upload-button {
+            background-color: #6c757d;
+            color: white;
+            padding: 0.75rem 1rem;
+            border-top-left-radius: 8px;
+            border-bottom-left-radius: 8px;
+            white-space: nowrap;
+        }
+        .file-name-display {
+            flex-grow: 1;
+            padding: 0.75rem 1rem;
+            border: 1px solid #ced4da;
+            border-left: none;
+            border-top-right-radius: 8px;
+            border-bottom-right-radius: 8px;
+            color: #6c757d;
+            overflow: hidden;
+            text-overflow: ellipsis;
+            white-space: nowrap;
+        }
+        .submit-btn {
+            width: 100%;
+            padding: 0.85rem 1.5rem;
+            border: none;
+            border-radius: 8px;
+            background-color: var(--primary-color);
+            color: white;
+            font-size: 1.1rem;
+            font-weight: 600;
+            cursor: pointer;
+            transition: background-color 0.2s, transform 0.1s;
+            display: flex;
+            justify-content: center;
+            align-items: center;
+        }
+        .submit-btn:hover:not(:disabled) {
+            background-color: var(--primary-hover);
+            transform: scale(1.02);
+        }
+        .submit-btn:disabled {
+            background-color: #6c757d;
+            cursor: not-allowed;
+            opacity: 0.8;
+        }
+        .spinner {
+            width: 20px;
+            height: 20px;
+            border: 3px solid rgba(255, 255, 255, 0.3);
+            border-radius: 50%;
+            border-top-color: #fff;
+            animation: spin 1s ease-in-out infinite;
+            margin-right: 10px;
+        }
+        @keyframes spin {
+            to { transform: rotate(360deg); }
+        }
+        .message {
+            text-align: center;
+            padding: 1rem;
+            margin-bottom: 2rem;
+            border-radius: 8px;
+            font-weight: 600;
+        }
+        .error {
+            background-color: var(--error-bg);
+            color: var(--error-text);
+        }
+    </style>
+</head>
+<body>
+    <div class="container">
+        <div class="header">
+            <h1>Professional PDF Toolkit</h1>
+            <p>Your one-stop solution for quick PDF modifications.</p>
+        </div>
+        
+        {% with messages = get_flashed_messages(with_categories=true) %}
+            {% if messages %}
+                {% for category, message in messages %}
+                    <div class="message {{ category }}">{{ message }}</div>
+                {% endfor %}
+            {% endif %}
+        {% endwith %}
+
+        <!-- NEW MERGE PDF CARD -->
+        <div class="tool-card">
+            <h2>Merge Multiple PDFs</h2>
+            <form action="/merge_pdfs" method="post" enctype="multipart/form-data" class="pdf-form">
+                <div class="form-group">
+                    <label for="pdf_files_merge">Upload your PDF files (2 or more)</label>
+                    <div class="file-upload-wrapper">
+                        <span class="file-upload-button">Choose Files</span>
+                        <span class="file-name-display">No files selected...</span>
+                        <input type="file" id="pdf_files_merge" name="pdf_files" accept=".pdf" required multiple class="file-upload-input">
+                    </div>
+                </div>
+                <div class="form-group">
+                    <label for="image_dpi_merge">Image Quality</label>
+                    <select id="image_dpi_merge" name="image_dpi" class="form-control">
+                        <option value="">Keep original images</option>
+                        <option value="300">Print (300 dpi)</option>
+                        <option value="150">Screen (150 dpi)</option>
+                        <option value="96">Smallest (96 dpi)</option>
+                    </select>
+                </div>
+                <div class="form-group">
+                    <label for="output_profile_merge">Output Profile</label>
+                    <select id="output_profile_merge" name="output_profile" class="form-control">
+                        {% for name in output_profiles %}
+                            <option value="{{ name }}">{{ name }}</option>
+                        {% endfor %}
+                    </select>
+                </div>
+                <button type="submit" class="submit-btn">
+                    <span class="btn-text">Merge & Download</span>
+                </button>
+            </form>
+        </div>
+
+        <div class="tool-card">
+            <h2>Add Page Numbers</h2>
+            <form action="/add_page_numbers" method="post" enctype="multipart/form-data" class="pdf-form">
+                <div class="form-group">
+                    <label for="pdf_file_numbers">Upload your PDF file</label>
+                    <div class="file-upload-wrapper">
+                        <span class="file-upload-button">Choose File</span>
+                        <span class="file-name-display">No file selected...</span>
+                        <input type="file" id="pdf_file_numbers" name="pdf_file" accept=".pdf" required class="file-upload-input">
+                    </div>
+                </div>
+                <div class="form-group">
+                    <label for="output_profile_numbers">Output Profile</label>
+                    <select id="output_profile_numbers" name="output_profile" class="form-control">
+                        {% for name in output_profiles %}
+                            <option value="{{ name }}">{{ name }}</option>
+                        {% endfor %}
+                    </select>
+                </div>
+                <button type="submit" class="submit-btn">
+                    <span class="btn-text">Add Numbers & Download</span>
+                </button>
+            </form>
+        </div>
+
+        <div class="tool-card">
+            <h2>Split PDF into Multiple Files</h2>
+            <form action="/split_pdf" method="post" enctype="multipart/form-data" class="pdf-form">
+                <div class="form-group">
+                    <label for="pdf_file_split">Upload your PDF file</label>
+                     <div class="file-upload-wrapper">
+                        <span class="file-upload-button">Choose File</span>
+                        <span class="file-name-display">No file selected...</span>
+                        <input type="file" id="pdf_file_split" name="pdf_file" accept=".pdf" required class="file-upload-input">
+                    </div>
+                </div>
+                <div class="form-group">
+                    <label for="page_ranges">Page Ranges to Split</label>
+                    <input type="text" id="page_ranges" name="page_ranges" class="form-control" placeholder="e.g., 1-3, 5, 8-10" required>
+                </div>
+                <div class="form-group">
+                    <label for="output_profile_split">Output Profile</label>
+                    <select id="output_profile_split" name="output_profile" class="form-control">
+                        {% for name in output_profiles %}
+                            <option value="{{ name }}">{{ name }}</option>
+                        {% endfor %}
+                    </select>
+                </div>
+                <button type="submit" class="submit-btn">
+                    <span class="btn-text">Split & Download ZIP</span>
+                </button>
+            </form>
+        </div>
+    </div>
+
+    <script>
+        // Files bigger than this are sent through the chunked upload API,
+        // so a dropped connection only costs the chunks that were in flight.
+        const CHUNKED_UPLOAD_THRESHOLD = 32 * 1024 * 1024;
+        const PARALLEL_CHUNKS = 4;
+        const CHUNK_RETRIES = 5;
+
+        async function sha256Hex(buffer) {
+            // crypto.subtle only exists on https:// and localhost pages.
+            if (!window.crypto || !window.crypto.subtle) return null;
+            const digest = await crypto.subtle.digest('SHA-256', buffer);
+            return Array.from(new Uint8Array(digest)).map(b => b.toString(16).padStart(2, '0')).join('');
+        }
+
+        async function startOrResumeUpload(file) {
+            // Remember the upload id so a reload or a retry picks up where it left off.
+            const key = `pdf-upload:${file.name}:${file.size}:${file.lastModified}`;
+            const savedId = localStorage.getItem(key);
+            if (savedId) {
+                const res = await fetch(`/uploads/${savedId}`);
+                if (res.ok) return Object.assign(await res.json(), {key});
+                localStorage.removeItem(key);
+            }
+            const res = await fetch('/uploads', {
+                method: 'POST',
+                headers: {'Content-Type': 'application/json'},
+                body: JSON.stringify({filename: file.name, size: file.size})
+            });
+            const upload = await res.json();
+            if (!res.ok) throw new Error(upload.error);
+            localStorage.setItem(key, upload.upload_id);
+            return Object.assign(upload, {key, received_offsets: []});
+        }
+
+        async function sendChunk(upload, file, offset) {
+            const buffer = await file.slice(offset, offset + upload.chunk_size).arrayBuffer();
+            const headers = {'Content-Type': 'application/octet-stream'};
+            const checksum = await sha256Hex(buffer);
+            if (checksum) headers['X-Chunk-SHA256'] = checksum;
+
+            for (let attempt = 1; ; attempt++) {
+                try {
+                    const res = await fetch(`/uploads/${upload.upload_id}/chunks?offset=${offset}`, {
+                        method: 'PUT', headers, body: buffer
+                    });
+                    if (res.ok) return;
+                    if (attempt >= CHUNK_RETRIES) throw new Error((await res.json()).error);
+                } catch (err) {
+                    if (attempt >= CHUNK_RETRIES) throw err;
+                }
+                await new Promise(resolve => setTimeout(resolve, 500 * 2 ** attempt));
+            }
+        }
+
+        async function uploadInChunks(file, onProgress) {
+            const upload = await startOrResumeUpload(file);
+            const received = new Set(upload.received_offsets);
+            const pending = [];
+            for (let offset = 0; offset < file.size; offset += upload.chunk_size) {
+                if (!received.has(offset)) pending.push(offset);
+            }
+            const total = Math.ceil(file.size / upload.chunk_size);
+            let finished = total - pending.length;
+
+            const worker = async () => {
+                while (pending.length) {
+                    await sendChunk(upload, file, pending.shift());
+                    onProgress(++finished, total);
+                }
+            };
+            await Promise.all(Array.from({length: PARALLEL_CHUNKS}, worker));
+            // The id stays saved: if the job fails, submitting again reuses the
+            // finished upload. Once a job succeeds the server drops it, and the
+            // next lookup clears the saved id.
+            return upload.upload_id;
+        }
+
+        document.addEventListener('DOMContentLoaded', function() {
+            // UPDATED SCRIPT to handle both single and multiple file inputs
+            const fileInputs = document.querySelectorAll('.file-upload-input');
+            fileInputs.forEach(input => {
+                input.addEventListener('change', function() {
+                    const fileNameDisplay = this.parentElement.querySelector('.file-name-display');
+                    if (this.files.length > 1) {
+                        fileNameDisplay.textContent = `${this.files.length} files selected`;
+                    } else if (this.files.length === 1) {
+                        fileNameDisplay.textContent = this.files[0].name;
+                    } else {
+                        fileNameDisplay.textContent = 'No file selected...';
+                    }
+                });
+            });
+
+            // Handle form submission with loading state
+            const forms = document.querySelectorAll('.pdf-form');
+            forms.forEach(form => {
+                form.addEventListener('submit', function(e) {
+                    const submitBtn = this.querySelector('.submit-btn');
+                    const btnText = submitBtn.querySelector('.btn-text');
+
+                    const fileInput = this.querySelector('input[type="file"]');
+                    if (fileInput.files.length === 0) {
+                        alert('Please select a file first.');
+                        e.preventDefault();
+                        return;
+                    }
+                    
+                    // Specific check for merge tool
+                    if(fileInput.id === 'pdf_files_merge' && fileInput.files.length < 2) {
+                        alert('Please select at least two PDF files to merge.');
+                        e.preventDefault();
+                        return;
+                    }
+
+                    // Show loading state
+                    const originalText = btnText.textContent;
+                    submitBtn.disabled = true;
+                    btnText.textContent = 'Processing...';
+                    const spinner = document.createElement('div');
+                    spinner.className = 'spinner';
+                    submitBtn.prepend(spinner);
+
+                    // Large files go up in chunks first; the form then only carries upload ids.
+                    const files = Array.from(fileInput.files);
+                    if (!files.some(f => f.size > CHUNKED_UPLOAD_THRESHOLD)) return;
+                    e.preventDefault();
+                    const fieldName = fileInput.multiple ? 'upload_ids' : 'upload_id';
+                    (async () => {
+                        try {
+                            for (const file of files) {
+                                const uploadId = await uploadInChunks(file, (done, total) => {
+                                    btnText.textContent = `Uploading ${file.name}: ${Math.round(100 * done / total)}%`;
+                                });
+                                const hidden = document.createElement('input');
+                                hidden.type = 'hidden';
+                                hidden.name = fieldName;
+                                hidden.value = uploadId;
+                                form.appendChild(hidden);
+                            }
+                            fileInput.disabled = true;
+                            btnText.textContent = 'Processing...';
+                            form.submit();
+                        } catch (err) {
+                            alert(`Upload interrupted: ${err.message}. Submit again to resume.`);
+                            form.querySelectorAll(`input[name="${fieldName}"]`).forEach(el => el.remove());
+                            submitBtn.disabled = false;
+                            btnText.textContent = originalText;
+                            spinner.remove();
+                        }
+                    })();
+                });
+            });
+        });
+    </script>
+</body>
+</html>
+"""
+
+# --- FORM AND UPLOAD HELPERS ---
+
+def read_finished_upload(upload_id):
+    """
+    Returns (filename, pdf_bytes) for a completed chunked upload. Raises
+    ValueError if the upload is unknown or unfinished. The spool file is
+    kept until discard_uploads() is called for it.
+    """
+    filename, spool_path = chunked_uploads.finalize_upload(upload_id)
+    with open(spool_path, 'rb') as spool:
+        pdf_bytes = spool.read()
+    return filename, pdf_bytes
+
+def discard_uploads(upload_ids):
+    """
+    Frees the spool files of the chunked uploads a job used, once that job
+    has succeeded. Until then a refused or failed job can be submitted
+    again without uploading anything.
+    """
+    for upload_id in upload_ids:
+        if upload_id:
+            chunked_uploads.discard_upload(upload_id)
+
+def requested_output_profile(form):
+    """
+    Returns the output profile picked in the form (or the default one).
+    Raises ValueError for a name we don't know.
+    """
+    return output_profiles.check_profile(form.get('output_profile') or output_profiles.DEFAULT_PROFILE)
+
+def requested_image_dpi(form):
+    """
+    Returns the image resolution picked in the form, or None to leave the
+    images alone. Raises ValueError for anything but a positive number.
+    """
+    value = (form.get('image_dpi') or '').strip()
+    if not value:
+        return None
+    if not value.isdigit() or int(value) <= 0:
+        raise ValueError('Image resolution must be a positive number of dpi.')
+    return int(value)
@@ -0,0 +1,158 @@
+import os
+import json
+import hashlib
+import fitz  # PyMuPDF
+
+# Keeps a small index of every page we have already put into a
+# highlights PDF in this folder. When another edition of the same book
+# has the same page with the same highlights, we can leave it out (or
+# point to where it already is) instead of writing it again.
+
+# The index lives next to the PDFs, so each folder has its own.
+INDEX_FILENAME = '.my_highlights_index.json'
+
+# --- FINGERPRINTS ---
+
+def page_fingerprint(doc, page):
+    """
+    Returns a hash of what makes this page look the way it does: its
+    content streams, the images it draws, and its highlight annotations
+    (position and color). Two pages with the same text but different
+    highlights get different fingerprints.
+    """
+    h = hashlib.blake2b(digest_size=20)
+    h.update(page.read_contents())
+
+    # Scanned pages often share the same tiny content stream ("draw Im0"),
+    # so the image data itself has to be part of the fingerprint.
+    for image in page.get_images(full=True):
+        h.update(doc.xref_stream_raw(image[0]) or b'')
+
+    for annot in page.annots(types=[fitz.PDF_ANNOT_HIGHLIGHT]):
+        rect = tuple(round(v, 1) for v in annot.rect)
+        color = tuple(round(c, 2) for c in (annot.colors['stroke'] or ()))
+        h.update(repr((rect, color)).encode())
+
+    return h.hexdigest()
+
+# --- THE INDEX ---
+
+def load_index(folder_path):
+    """
+    Loads the folder's index, or starts an empty one.
+    """
+    try:
+        with open(os.path.join(folder_path, INDEX_FILENAME), encoding='utf-8') as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return {'pages': {}}
+
+def save_index(folder_path, index):
+    # Write a temporary file and rename it, so a crash can't leave half an index.
+    path = os.path.join(folder_path, INDEX_FILENAME)
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(index, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+def forget_source(index, source_filename):
+    """
+    Drops every entry that came from 'source_filename'.
+    """
+    index['pages'] = {fp: entry for fp, entry in index['pages'].items()
+                      if entry['source'] != source_filename}
+
+def _source_stamp(folder_path, source_filename):
+    """
+    Returns (size, mtime_ns) of a source PDF, or None if it is gone.
+    """
+    try:
+        stat = os.stat(os.path.join(folder_path, source_filename))
+    except OSError:
+        return None
+    return stat.st_size, stat.st_mtime_ns
+
+def _entry_is_current(folder_path, entry):
+    """
+    True if the highlights PDF an entry points at is still there, and the
+    source it came from is still there and unchanged. Entries from older
+    indexes carry no stamp; for those the source only has to exist.
+    """
+    if not os.path.exists(os.path.join(folder_path, entry['output'])):
+        return False
+    stamp = _source_stamp(folder_path, entry['source'])
+    if stamp is None:
+        return False
+    return 'source_size' not in entry or stamp == (entry['source_size'], entry['source_mtime_ns'])
+
+def find_duplicate_pages(doc, page_indexes, source_filename, output_filename, index, folder_path):
+    """
+    Splits 'page_indexes' into pages we haven't seen before and pages that
+    are already in another highlights PDF. Entries that came from
+    'source_filename' itself (an earlier run on the same file) don't count,
+    so a file is never reported as a copy of itself. Neither do entries
+    whose highlights PDF was deleted or whose source was deleted or
+    changed; those are dropped from the index and the page is kept. New
+    entries are not added; pass 'new_entries' to record_pages() once
+    'output_filename' has really been written.
+
+    Returns (pages_to_keep, duplicates, new_entries), where each duplicate
+    is a pair of (page_index, entry) and the entry says where that page
+    already lives.
+    """
+    pages_to_keep = []
+    duplicates = []
+    new_entries = {}
+    checked = {}  # Many entries share one output; check each only once
+    size, mtime_ns = _source_stamp(folder_path, source_filename) or (None, None)
+
+    for page_index in page_indexes:
+        fingerprint = page_fingerprint(doc, doc[page_index])
+        if fingerprint in new_entries:
+            duplicates.append((page_index, new_entries[fingerprint]))
+            continue
+        entry = index['pages'].get(fingerprint)
+        if entry is not None and entry['source'] != source_filename:
+            key = (entry['output'], entry['source'], entry.get('source_size'), entry.get('source_mtime_ns'))
+            if key not in checked:
+                checked[key] = _entry_is_current(folder_path, entry)
+            if checked[key]:
+                duplicates.append((page_index, entry))
+                continue
+            del index['pages'][fingerprint]
+        pages_to_keep.append(page_index)
+        new_entries[fingerprint] = {
+            'source': source_filename,
+            'output': output_filename,
+            'page': len(pages_to_keep),  # 1-based page number in the output
+            'source_size': size,
+            'source_mtime_ns': mtime_ns,
+        }
+    return pages_to_keep, duplicates, new_entries
+
+def record_pages(index, source_filename, new_entries):
+    """
+    Replaces whatever the index had from 'source_filename' with
+    'new_entries' (from find_duplicate_pages). Call it only after the
+    output has been saved, so the index never points at a file that isn't
+    there.
+    """
+    forget_source(index, source_filename)
+    index['pages'].update(new_entries)
+
+def add_reference_page(new_doc, duplicates):
+    """
+    Appends a plain text page to 'new_doc' that lists where each left-out
+    page can be found.
+    """
+    lines = [f"Page {page_index + 1}: see page {entry['page']} of {entry['output']}"
+             for page_index, entry in duplicates]
+    lines_per_page = 50
+
+    for start in range(0, len(lines), lines_per_page):
+        page = new_doc.new_page()
+        text = "\n".join(["Pages left out because they are already in another highlights file:", ""]
+                         + lines[start:start + lines_per_page])
+        page.insert_textbox(page.rect + (50, 50, -50, -50), text, fontsize=10)
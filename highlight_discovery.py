@@ -0,0 +1,101 @@
+import os
+import fnmatch
+from datetime import datetime
+
+# Finds the PDFs to work on. The folder is walked with os.scandir, which
+# gets the file type from the directory listing itself (no extra stat per
+# file), and files are handed out one by one while the walk goes on, so
+# the first book is being scanned long before a big archive is listed.
+
+def parse_date(value):
+    """
+    Turns a 'YYYY-MM-DD' string (or a timestamp) into a timestamp.
+    """
+    if value is None or isinstance(value, (int, float)):
+        return value
+    return datetime.fromisoformat(value).timestamp()
+
+def matches_any(relative_path, patterns):
+    """
+    True if the path (with '/' separators) or just its last part matches
+    one of the glob patterns, e.g. '*.pdf', 'Archive/*' or 'drafts'.
+    Case doesn't matter, as with the '.pdf' check.
+    """
+    relative_path = relative_path.lower()
+    name = relative_path.rsplit('/', 1)[-1]
+    return any(fnmatch.fnmatchcase(relative_path, pattern.lower()) or fnmatch.fnmatchcase(name, pattern.lower())
+               for pattern in patterns)
+
+def is_excluded_dir(relative_path, patterns):
+    """
+    True if a folder matches one of the exclude patterns itself ('drafts')
+    or as the folder of its contents ('Old/*').
+    """
+    contents = relative_path.lower() + '/*'
+    return matches_any(relative_path, patterns) or any(fnmatch.fnmatchcase(contents, pattern.lower())
+                                                       for pattern in patterns)
+
+def iter_pdf_files(folder_path, suffix, recursive=False, include=('*.pdf',), exclude=(),
+                   min_size=None, max_size=None, modified_after=None, modified_before=None,
+                   on_error=None):
+    """
+    Yields the path (relative to 'folder_path', with '/' separators) of
+    every PDF we should process, in a stable order: sorted by name within
+    each folder, files before subfolders.
+
+    Our own output files (ending in 'suffix') are skipped wherever they
+    are, and so are hidden files and folders (names starting with '.',
+    which includes our index, journal and temporary files). Folders that
+    match an 'exclude' pattern are not entered at all. Size limits are in
+    bytes; dates are 'YYYY-MM-DD' strings or timestamps.
+
+    A folder that can't be read is passed to on_error(relative_path, error)
+    and skipped; the top folder itself raises as usual.
+    """
+    suffix = suffix.lower()
+    modified_after = parse_date(modified_after)
+    modified_before = parse_date(modified_before)
+    needs_stat = any(limit is not None for limit in (min_size, max_size, modified_after, modified_before))
+
+    pending = ['']  # Folders still to list, relative to folder_path
+    while pending:
+        relative_dir = pending.pop()
+        try:
+            with os.scandir(os.path.join(folder_path, relative_dir)) as listing:
+                entries = sorted(listing, key=lambda entry: entry.name)
+        except OSError as e:
+            if not relative_dir or on_error is None:
+                raise
+            on_error(relative_dir, e)
+            continue
+
+        subdirs = []
+        for entry in entries:
+            if entry.name.startswith('.'):
+                continue
+            relative_path = f'{relative_dir}/{entry.name}' if relative_dir else entry.name
+
+            if entry.is_dir(follow_symlinks=False):
+                if recursive and not is_excluded_dir(relative_path, exclude):
+                    subdirs.append(relative_path)
+                continue
+
+            name = entry.name.lower()
+            if not name.endswith('.pdf') or name.endswith(suffix):
+                continue
+            if not matches_any(relative_path, include) or matches_any(relative_path, exclude):
+                continue
+            if needs_stat:
+                try:
+                    stat = entry.stat()
+                except OSError:
+                    continue  # Gone since the listing
+                if ((min_size is not None and stat.st_size < min_size)
+                        or (max_size is not None and stat.st_size > max_size)
+                        or (modified_after is not None and stat.st_mtime < modified_after)
+                        or (modified_before is not None and stat.st_mtime >= modified_before)):
+                    continue
+            yield relative_path
+
+        # Reversed, so the first subfolder comes off the stack first.
+        pending.extend(reversed(subdirs))
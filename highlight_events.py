@@ -0,0 +1,219 @@
+import sys
+import json
+import time
+
+# Everything main.py has to say about a run goes out as an event: a plain
+# dict with an 'event' name, a 'time' stamp and a few fields. Sinks decide
+# what to do with them, e.g. print the familiar messages, draw a progress
+# bar or append to a JSON Lines log. Any function that takes an event dict
+# also works as a sink, which is the way to embed the extractor in another
+# program.
+#
+# Events and their fields:
+#   run_started    folder, files (None if not counted up front), scan_mode
+#   file_resumed   file (already done by an interrupted run, see highlight_journal.py)
+#   file_started   file, pages
+#   page_matched   file, page (1-based)
+#   file_probed    file, pages, first_match (1-based, or None)
+#   file_estimated file, pages, sampled, estimate, low, high, exact
+#   file_skipped   file, pages, reason ('no_matches' or 'all_duplicates'), matched, duplicates
+#   file_saved     file, pages, output, matched, kept, duplicates, images, size, seconds, profile
+#   error          file (None for run-level problems), message
+#   run_summary    files, created, with_matches, scan_mode, seconds
+
+# Events that end the work on one file.
+FILE_DONE_EVENTS = ('file_resumed', 'file_probed', 'file_estimated', 'file_skipped', 'file_saved', 'error')
+
+class EventStream:
+    """
+    Sends each event to every sink. Sinks with a close() method are closed
+    by close().
+    """
+
+    def __init__(self, sinks):
+        self.sinks = list(sinks)
+
+    def emit(self, event, **fields):
+        record = {'event': event, 'time': time.time(), **fields}
+        for sink in self.sinks:
+            sink(record)
+
+    def close(self):
+        for sink in self.sinks:
+            if hasattr(sink, 'close'):
+                sink.close()
+
+# --- SINKS ---
+
+class JsonlSink:
+    """
+    Appends every event to a JSON Lines file, one object per line. The file
+    is flushed whenever a file is finished, so a run that dies (or a tail -f
+    on the log) sees everything up to the last finished file.
+    """
+
+    def __init__(self, path):
+        self.file = open(path, 'a', encoding='utf-8')
+
+    def __call__(self, record):
+        self.file.write(json.dumps(record, ensure_ascii=False) + '\n')
+        if record['event'] in FILE_DONE_EVENTS or record['event'] in ('run_started', 'run_summary'):
+            self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+class ConsoleSink:
+    """
+    Prints the human-readable messages. Lines are collected and written
+    once per file instead of one print per line. When the output is not a
+    terminal (a log file, a pipe) the per-page lines are left out.
+    """
+
+    def __init__(self, stream=None, show_pages=None):
+        self.stream = stream or sys.stdout
+        self.show_pages = self.stream.isatty() if show_pages is None else show_pages
+        self.lines = []
+        self.current = None
+        self.resumed = 0
+
+    def flush(self):
+        if self.lines:
+            self.stream.write('\n'.join(self.lines) + '\n')
+            self.stream.flush()
+            self.lines = []
+
+    def __call__(self, record):
+        event = record['event']
+        add = self.lines.append
+
+        if event == 'file_resumed':
+            self.resumed += 1  # One line for all of them, below
+            return
+        if self.resumed:
+            add(f"⏭️  Resuming an interrupted run: {self.resumed} file(s) were already done.\n")
+            self.resumed = 0
+
+        if event == 'run_started':
+            add(f"Searching for PDF files in: {record['folder']}\n")
+            if record['files']:
+                add(f"Found {record['files']} PDF file(s). Starting scan...\n")
+        elif event == 'file_started':
+            self.current = record['file']
+            add(f"--- 📖 Processing: {record['file']} ---")
+        elif event == 'page_matched':
+            if self.show_pages:
+                add(f"  > Match found on Page {record['page']}! (Your highlight)")
+        elif event == 'file_probed':
+            if record['first_match'] is None:
+                add("  - No matching highlights.\n")
+            else:
+                add(f"  ✅ Has matching highlights (first on page {record['first_match']}).\n")
+        elif event == 'file_estimated':
+            if record['exact']:
+                add(f"  📊 {record['estimate']} of {record['pages']} pages have matching highlights.\n")
+            else:
+                add(f"  📊 About {record['estimate']} of {record['pages']} pages have matching highlights "
+                    f"(95% range {record['low']}-{record['high']}, {record['sampled']} pages sampled).\n")
+        elif event == 'file_skipped':
+            if record['reason'] == 'no_matches':
+                add("  - No highlights matching your specific colors were found in this file.\n")
+            else:
+                self._add_found(record)
+                add("  - Every highlighted page is already saved elsewhere. Nothing new to write.\n")
+        elif event == 'file_saved':
+            self._add_found(record)
+            images = record['images']
+            if images and images['images']:
+                add(f"  🖼️  Recompressed {images['images']} image(s): "
+                    f"{images['bytes_before'] // 1024} KB -> {images['bytes_after'] // 1024} KB")
+            add(f"  👍 Successfully saved: {record['output']} "
+                f"({record['size'] / 1024:.0f} KB in {record['seconds']:.2f}s, profile '{record['profile']}')\n")
+        elif event == 'error':
+            if record['file'] is None:
+                add(f"❌ ERROR accessing folder: {record['message']}")
+                add("Please check the folder path and grant storage permissions to the app.")
+            else:
+                if record['file'] != self.current:  # Failed before it could start
+                    add(f"--- 📖 Processing: {record['file']} ---")
+                add(f"  ❌ An error occurred while processing '{record['file']}': {record['message']}\n")
+        elif event == 'run_summary':
+            if not record['files']:
+                add("No source PDF files were found to process.")
+            else:
+                add("--- 🏁 Processing Complete! ---")
+                if record['scan_mode'] in ('probe', 'estimate'):
+                    add(f"{record['with_matches']} of {record['files']} file(s) have matching highlights.")
+                elif record['created'] > 0:
+                    add(f"Created {record['created']} new PDF file(s) in your TEXT folder.")
+                else:
+                    add("No new PDFs were created. If you are sure you have yellow, green, or blue highlights,")
+                    add("the color codes in the PDF might be slightly different. Let me know if this happens.")
+
+        if event in FILE_DONE_EVENTS or event in ('run_started', 'run_summary'):
+            self.flush()
+
+    def _add_found(self, record):
+        self.lines.append(f"\n  ✅ Found {record['matched']} pages with your highlights. Creating new PDF...")
+        if record['duplicates']:
+            self.lines.append(f"  ♻️  {record['duplicates']} page(s) are already in another highlights file.")
+
+    def close(self):
+        self.flush()
+
+class ProgressBar:
+    """
+    A single self-updating status line: files done, pages per second and
+    the estimated time left. Redrawn at most a few times per second.
+    """
+
+    def __init__(self, stream=None, width=24, interval=0.2):
+        self.stream = stream or sys.stderr
+        self.width = width
+        self.interval = interval
+        self.total = None
+        self.done = 0
+        self.pages = 0
+        self.errors = 0
+        self.current = ''
+        self.started = time.perf_counter()
+        self.last_draw = 0.0
+
+    def __call__(self, record):
+        event = record['event']
+        if event == 'run_started':
+            self.total = record['files']
+            self.started = time.perf_counter()
+        elif event == 'file_started':
+            self.current = record['file']
+        elif event in FILE_DONE_EVENTS and record.get('file') is not None:
+            self.done += 1
+            self.pages += record.get('pages') or 0
+            self.errors += event == 'error'
+        elif event == 'run_summary':
+            self.draw(force=True)
+            self.stream.write(f"\nDone: {record['files']} file(s), {record['created']} created, "
+                              f"{self.errors} error(s) in {record['seconds']:.1f}s\n")
+            self.stream.flush()
+            return
+        self.draw()
+
+    def draw(self, force=False):
+        now = time.perf_counter()
+        if not force and now - self.last_draw < self.interval:
+            return
+        self.last_draw = now
+        elapsed = now - self.started
+        rate = self.pages / elapsed if elapsed > 0 else 0.0
+
+        if self.total:
+            filled = self.width * min(self.done, self.total) // self.total
+            bar = f"[{'#' * filled}{'-' * (self.width - filled)}] {self.done}/{self.total} files"
+            if self.done and self.done < self.total:
+                eta = elapsed / self.done * (self.total - self.done)
+                bar += f" | ETA {int(eta) // 60}m{int(eta) % 60:02d}s"
+        else:
+            bar = f"{self.done} files"
+        line = f"{bar} | {rate:.0f} pages/s | {self.current[:30]}"
+        self.stream.write('\r' + line.ljust(100)[:100])
+        self.stream.flush()
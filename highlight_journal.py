@@ -0,0 +1,99 @@
+import os
+import json
+
+# A checkpoint journal for long batch runs. After each PDF is finished a
+# line is appended (and flushed to disk) saying so. If the run is killed,
+# the next run reads the journal and carries on with the first file that
+# isn't in it. A run that completes deletes its journal.
+#
+# The first line holds the run's settings. If they have changed since the
+# interrupted run (other colors, another profile, ...) the old journal is
+# ignored and everything is done again.
+
+# The journal lives next to the PDFs, like the dedup index.
+JOURNAL_FILENAME = '.my_highlights_journal.jsonl'
+
+class Journal:
+
+    def __init__(self, folder_path, settings):
+        self.path = os.path.join(folder_path, JOURNAL_FILENAME)
+        self.settings = settings
+        self.done = self._load()
+
+        resuming = bool(self.done)
+        self.file = open(self.path, 'a' if resuming else 'w', encoding='utf-8')
+        if not resuming:
+            self._append({'settings': settings})
+
+    def _load(self):
+        """
+        Returns {filename: entry} from an earlier run with the same
+        settings, or {} if there is none.
+        """
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                lines = f.read().splitlines()
+        except FileNotFoundError:
+            return {}
+
+        done = {}
+        for number, line in enumerate(lines):
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue  # The last line may be cut short by the crash
+            if number == 0:
+                if entry.get('settings') != self.settings:
+                    return {}
+                continue
+            done[entry['file']] = entry
+        return done
+
+    def _append(self, entry):
+        self.file.write(json.dumps(entry, ensure_ascii=False) + '\n')
+        self.file.flush()
+        os.fsync(self.file.fileno())
+
+    def finished_before(self, filename, pdf_path):
+        """
+        Returns the journal entry if 'filename' was finished by the
+        interrupted run and hasn't been changed since, otherwise None.
+        """
+        entry = self.done.get(filename)
+        if entry is None:
+            return None
+        try:
+            stat = os.stat(pdf_path)
+        except OSError:
+            return None
+        if entry['size'] != stat.st_size or entry['mtime_ns'] != stat.st_mtime_ns:
+            return None
+        return entry
+
+    def record(self, filename, pdf_path, created, matched, index_entries=None):
+        """
+        Notes that 'filename' is done. Call it only after its output file
+        is safely on disk. 'index_entries' are the dedup index entries the
+        file added (see highlight_dedup.record_pages); they are kept here so
+        the index only has to be saved at the end of the run.
+        """
+        stat = os.stat(pdf_path)
+        entry = {'file': filename, 'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns,
+                 'created': created, 'matched': matched}
+        if index_entries is not None:
+            entry['index_entries'] = index_entries
+        self._append(entry)
+        self.done[filename] = entry
+
+    def close(self):
+        """
+        Stops writing but keeps the journal, e.g. when the run is stopped.
+        """
+        self.file.close()
+
+    def finish(self):
+        """
+        The run is complete: the journal is no longer needed.
+        """
+        self.file.close()
+        os.remove(self.path)
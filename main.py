@@ -1,5 +1,16 @@
 import fitz  # PyMuPDF
 import os
+import math
+import time
+import random
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from Pdftools.output_profiles import save_document
+from Pdftools.image_optimizer import optimize_images
+import highlight_dedup
+import highlight_events
+import highlight_journal
+import highlight_discovery
 
 # --- CONFIGURATION ---
 
@@ -23,6 +34,71 @@ COLOR_TOLERANCE = 0.05
 # 4. The suffix for the new, created PDF file.
 OUTPUT_SUFFIX = '_my_highlights.pdf'
 
+# 5. How the new PDFs are saved. One of the profiles in Pdftools/output_profiles.py:
+#    'default', 'clean', 'compact' (smallest) or 'web' (linearized for fast web view).
+OUTPUT_PROFILE = 'clean'
+
+# 6. Scanned books often carry 600-dpi page images. Set a number (e.g. 150) to
+#    shrink and recompress images above that resolution in the new PDFs.
+#    Leave it as None to keep the original images.
+IMAGE_TARGET_DPI = None
+
+# 7. What to do with a page that is already in another highlights PDF in this
+#    folder (for example the same page of another edition of the book):
+#    None        - keep every page (no checking)
+#    'skip'      - leave the duplicate page out
+#    'reference' - leave it out and add a note page saying where it already is
+DEDUP_MODE = None
+
+# 8. How much work to do per file:
+#    'full'     - check every page and create the highlights PDF (normal use)
+#    'probe'    - only answer "does this file have any of my highlights?"; stops
+#                 at the first match and creates nothing
+#    'estimate' - check a random sample of pages and estimate how many pages
+#                 have highlights (with a 95% range); creates nothing
+SCAN_MODE = 'full'
+
+# 9. How many pages 'estimate' mode looks at per file.
+SAMPLE_SIZE = 200
+
+# 10. Big PDFs are scanned by several processes at once, each taking a range
+#     of pages. PAGE_WORKERS is how many (None = one per CPU core); files with
+#     fewer than 2 x MIN_PAGES_PER_SHARD pages are scanned the normal way.
+PAGE_WORKERS = None
+MIN_PAGES_PER_SHARD = 500
+
+# 11. How the run reports on itself:
+#     'console'  - the usual messages (the per-page lines only when running
+#                  in a terminal, so logs and pipes stay fast)
+#     'progress' - one self-updating line with files done, pages/s and time left
+#     'quiet'    - nothing
+REPORT_STYLE = 'console'
+
+# 12. Set a file path (e.g. '/storage/emulated/0/TEXT/highlights_log.jsonl')
+#     to also record every event as one JSON object per line.
+EVENT_LOG_PATH = None
+
+# 13. Keep a journal of finished files, so a run that is stopped (or whose
+#     phone or machine shuts down) carries on where it left off next time.
+RESUME = True
+
+# 14. Which PDFs to pick up. With RECURSIVE = True every subfolder is searched
+#     too, and each new PDF is saved next to its source. Patterns are globs
+#     checked against the file name and its path inside the folder, e.g.
+#     INCLUDE_PATTERNS = ['*.pdf'] and EXCLUDE_PATTERNS = ['Old/*', '*draft*'].
+#     A subfolder matching an exclude pattern (as 'Old' or as 'Old/*') isn't
+#     searched at all.
+RECURSIVE = False
+INCLUDE_PATTERNS = ['*.pdf']
+EXCLUDE_PATTERNS = []
+
+# 15. Only PDFs within these limits (None = no limit). Sizes are in bytes,
+#     dates are 'YYYY-MM-DD' (file modification time).
+MIN_FILE_SIZE = None
+MAX_FILE_SIZE = None
+MODIFIED_AFTER = None
+MODIFIED_BEFORE = None
+
 # --- HELPER FUNCTION TO CHECK COLORS ---
 
 def is_color_close_enough(color_to_check, target_colors, tolerance):
@@ -46,95 +122,319 @@ def is_color_close_enough(color_to_check, target_colors, tolerance):
 
     return False # No match was found
 
+def page_has_target_highlight(page):
+    """
+    Returns True if the page has at least one highlight in one of our colors.
+    """
+    for annot in page.annots(types=[fitz.PDF_ANNOT_HIGHLIGHT]):
+        # The highlight color is stored in 'stroke'
+        if is_color_close_enough(annot.colors['stroke'], TARGET_COLORS, COLOR_TOLERANCE):
+            return True
+    return False
+
+# --- PARALLEL PAGE SCAN (for very big PDFs) ---
+
+def scan_page_range(pdf_path, start, stop):
+    """
+    Runs in a worker process: opens its own copy of the PDF and returns
+    the indexes of pages start..stop-1 that have one of our highlights.
+    """
+    with fitz.open(pdf_path) as doc:
+        return [page_index for page_index in range(start, stop)
+                if page_has_target_highlight(doc[page_index])]
+
+def find_highlighted_pages(doc, pdf_path, workers=None):
+    """
+    Returns the indexes of all pages with one of our highlights, in page
+    order. Big documents are split into page ranges that are scanned in
+    parallel; the results are joined back in order.
+    """
+    if not doc.has_annots():
+        return []  # Cheap check: no annotations anywhere in the file
+
+    total_pages = len(doc)
+    workers = workers or PAGE_WORKERS or os.cpu_count() or 1
+    # Daemonic processes (e.g. some server workers) can't start a pool.
+    if (workers < 2 or total_pages < 2 * MIN_PAGES_PER_SHARD
+            or multiprocessing.current_process().daemon):
+        return [page_index for page_index, page in enumerate(doc) if page_has_target_highlight(page)]
+
+    # Highlights tend to bunch up in a few chapters, so use a few more
+    # ranges than workers to keep them all busy until the end.
+    shard_count = min(workers * 4, total_pages // MIN_PAGES_PER_SHARD)
+    bounds = [total_pages * i // shard_count for i in range(shard_count + 1)]
+    with ProcessPoolExecutor(max_workers=min(workers, shard_count)) as pool:
+        shards = pool.map(scan_page_range, [pdf_path] * shard_count, bounds[:-1], bounds[1:])
+        return [page_index for shard in shards for page_index in shard]
+
+# --- TRIAGE HELPERS (probe and estimate modes) ---
+
+def probe_document(doc):
+    """
+    Returns the index of the first page with one of our highlights, or None.
+    Stops as soon as it finds one.
+    """
+    if not doc.has_annots():
+        return None  # Cheap check: no annotations anywhere in the file
+    for page_index, page in enumerate(doc):
+        if page_has_target_highlight(page):
+            return page_index
+    return None
+
+def wilson_interval(successes, trials, z=1.96):
+    """
+    95% confidence range for a proportion (Wilson score interval). Unlike
+    the simple +/- formula it behaves well when the count is 0 or tiny.
+    """
+    if trials == 0:
+        return 0.0, 1.0
+    p = successes / trials
+    denominator = 1 + z * z / trials
+    centre = (p + z * z / (2 * trials)) / denominator
+    margin = z * math.sqrt(p * (1 - p) / trials + z * z / (4 * trials * trials)) / denominator
+    return max(0.0, centre - margin), min(1.0, centre + margin)
+
+def estimate_document(doc, sample_size):
+    """
+    Estimates how many pages have our highlights by checking a random
+    sample of pages. Small documents are simply counted in full.
+    Returns a dict with the estimate and its 95% range (in pages).
+    """
+    total_pages = len(doc)
+    if not doc.has_annots():
+        return {'pages': total_pages, 'sampled': total_pages, 'estimate': 0, 'low': 0, 'high': 0, 'exact': True}
+
+    if total_pages <= sample_size:
+        count = sum(1 for page in doc if page_has_target_highlight(page))
+        return {'pages': total_pages, 'sampled': total_pages, 'estimate': count,
+                'low': count, 'high': count, 'exact': True}
+
+    sample = random.sample(range(total_pages), sample_size)
+    hits = sum(1 for page_index in sample if page_has_target_highlight(doc[page_index]))
+    low, high = wilson_interval(hits, sample_size)
+    return {
+        'pages': total_pages,
+        'sampled': sample_size,
+        'estimate': round(hits / sample_size * total_pages),
+        'low': math.floor(low * total_pages),
+        'high': math.ceil(high * total_pages),
+        'exact': False,
+    }
+
 # --- MAIN FUNCTION ---
 
-def create_pdf_from_specific_highlights(folder_path, suffix):
+def make_event_stream(report_style=None, log_path=None, callback=None):
+    """
+    Builds the event stream for a run from the settings above (read when
+    it is called, so a program that changes them first gets its values).
+    'callback' (any function taking an event dict) is added as one more
+    sink.
+    """
+    report_style = REPORT_STYLE if report_style is None else report_style
+    log_path = EVENT_LOG_PATH if log_path is None else log_path
+    sinks = []
+    if report_style == 'console':
+        sinks.append(highlight_events.ConsoleSink())
+    elif report_style == 'progress':
+        sinks.append(highlight_events.ProgressBar())
+    if log_path:
+        sinks.append(highlight_events.JsonlSink(log_path))
+    if callback is not None:
+        sinks.append(callback)
+    return highlight_events.EventStream(sinks)
+
+def create_pdf_from_specific_highlights(folder_path, suffix, scan_mode='full', sample_size=None, events=None):
     """
     Scans PDFs, finds pages with highlights matching specific colors, and
     creates a new PDF from those pages.
+
+    With scan_mode='probe' or 'estimate' nothing is created; each file is
+    only triaged (see SCAN_MODE above).
+
+    Progress is reported through 'events' (see highlight_events.py); by
+    default a stream is built from REPORT_STYLE and EVENT_LOG_PATH.
+    'sample_size' defaults to SAMPLE_SIZE.
     """
-    print(f"Searching for PDF files in: {folder_path}\n")
+    sample_size = SAMPLE_SIZE if sample_size is None else sample_size
+    own_events = events is None
+    if own_events:
+        events = make_event_stream()
+    try:
+        run_highlight_scan(folder_path, suffix, scan_mode, sample_size, events)
+    finally:
+        if own_events:
+            events.close()
 
+def run_highlight_scan(folder_path, suffix, scan_mode, sample_size, events):
+    started = time.perf_counter()
     try:
-        all_files = os.listdir(folder_path)
+        os.scandir(folder_path).close()
     except Exception as e:
-        print(f"❌ ERROR accessing folder: {e}")
-        print("Please check the folder path and grant storage permissions to the app.")
+        events.emit('error', file=None, message=str(e))
         return
 
-    pdf_files = [f for f in all_files if f.lower().endswith('.pdf') and not f.lower().endswith(suffix)]
+    # Files are found while we work (see highlight_discovery.py), so the
+    # total isn't known up front. Only a progress bar needs it (for the time
+    # left), and then one quick listing-only pass counts the files first.
+    # The order is stable, so that with DEDUP_MODE the same file "wins" a
+    # duplicate page every run.
+    def find_pdf_files(on_error):
+        return highlight_discovery.iter_pdf_files(
+            folder_path, suffix, recursive=RECURSIVE, include=INCLUDE_PATTERNS, exclude=EXCLUDE_PATTERNS,
+            min_size=MIN_FILE_SIZE, max_size=MAX_FILE_SIZE,
+            modified_after=MODIFIED_AFTER, modified_before=MODIFIED_BEFORE, on_error=on_error)
 
-    if not pdf_files:
-        print("No source PDF files were found to process.")
-        return
+    file_total = None
+    if any(isinstance(sink, highlight_events.ProgressBar) for sink in events.sinks):
+        file_total = sum(1 for _ in find_pdf_files(on_error=lambda relative_dir, e: None))
+    pdf_files = find_pdf_files(on_error=lambda relative_dir, e: events.emit('error', file=relative_dir, message=str(e)))
+    events.emit('run_started', folder=folder_path, files=file_total, scan_mode=scan_mode)
 
-    print(f"Found {len(pdf_files)} PDF file(s). Starting scan...\n")
     total_new_files = 0
+    files_with_matches = 0
+    dedup_index = highlight_dedup.load_index(folder_path) if DEDUP_MODE else None
+    journal = None
+    if RESUME:
+        try:
+            journal = highlight_journal.Journal(folder_path, run_settings(suffix, scan_mode, sample_size))
+        except OSError as e:
+            # E.g. a read-only folder; the scan itself may still work.
+            events.emit('error', file=None, message=f"Can't keep a journal here, so this run can't be resumed: {e}")
 
+    file_count = 0
     for filename in pdf_files:
+        file_count += 1
         pdf_path = os.path.join(folder_path, filename)
-        print(f"--- 📖 Processing: {filename} ---")
 
-        pages_to_keep = [] # A list to store the page numbers we want
+        if journal is not None:
+            entry = journal.finished_before(filename, pdf_path)
+            if entry is not None:
+                total_new_files += entry['created']
+                files_with_matches += entry['matched']
+                # The index on disk is from before the interrupted run; put
+                # back what that run added for this file.
+                if dedup_index is not None and entry.get('index_entries') is not None:
+                    highlight_dedup.record_pages(dedup_index, filename, entry['index_entries'])
+                events.emit('file_resumed', file=filename)
+                continue
 
         try:
             with fitz.open(pdf_path) as doc:
-                # Loop through every page in the PDF
-                for page_index, page in enumerate(doc):
-                    # Get all highlight annotations on the current page
-                    annots = page.annots(types=[fitz.PDF_ANNOT_HIGHLIGHT])
-
-                    if not annots:
-                        continue # Skip page if it has no highlights at all
-
-                    # Now, check the color of EACH highlight on the page
-                    for annot in annots:
-                        # The highlight color is stored in 'stroke'
-                        annot_color = annot.colors['stroke']
-
-                        # Check if this highlight's color matches one of our targets
-                        if is_color_close_enough(annot_color, TARGET_COLORS, COLOR_TOLERANCE):
-                            print(f"  > Match found on Page {page_index + 1}! (Your highlight)")
-                            pages_to_keep.append(page_index)
-                            # Once we find one of YOUR highlights, we don't need to check
-                            # the rest on this page. We know we want to keep it.
-                            break # Go to the next page
-
-                # After checking all pages, see if we found any of your highlights
-                if pages_to_keep:
-                    print(f"\n  ✅ Found {len(pages_to_keep)} pages with your highlights. Creating new PDF...")
-
-                    # Remove duplicate page numbers (just in case)
-                    unique_pages = sorted(list(set(pages_to_keep)))
-
-                    new_doc = fitz.open() # Create a new empty PDF
-                    new_doc.insert_pdf(doc, from_page=unique_pages[0], to_page=unique_pages[0]) # Start with the first page
-                    
-                    # Insert the rest of the pages one by one
-                    for page_index in unique_pages[1:]:
-                        new_doc.insert_pdf(doc, from_page=page_index, to_page=page_index)
-
-                    output_filename = f"{os.path.splitext(filename)[0]}{suffix}"
-                    output_filepath = os.path.join(folder_path, output_filename)
-
-                    new_doc.save(output_filepath, garbage=4, deflate=True, clean=True)
-                    new_doc.close()
-
-                    print(f"  👍 Successfully saved: {output_filename}\n")
-                    total_new_files += 1
-                else:
-                    print("  - No highlights matching your specific colors were found in this file.\n")
-
+                created, matched, index_entries = process_file(doc, filename, pdf_path, folder_path, suffix,
+                                                               scan_mode, sample_size, dedup_index, events)
         except Exception as e:
-            print(f"  ❌ An error occurred while processing '{filename}': {e}\n")
+            events.emit('error', file=filename, message=str(e))
+            continue
+
+        total_new_files += created
+        files_with_matches += matched
+        if journal is not None:
+            # The file's new dedup index entries go into its journal line, so
+            # the (growing) index is only saved once, at the end of the run.
+            try:
+                journal.record(filename, pdf_path, created, matched, index_entries)
+            except OSError as e:
+                events.emit('error', file=None, message=f"Can't write the journal any more, so this run can't be resumed: {e}")
+                try:
+                    journal.close()
+                except OSError:
+                    pass
+                journal = None
+
+    # The index first: until the journal is gone, it can be rebuilt from it.
+    if dedup_index is not None:
+        highlight_dedup.save_index(folder_path, dedup_index)
+    if journal is not None:
+        journal.finish()
+
+    events.emit('run_summary', files=file_count, created=total_new_files, with_matches=files_with_matches,
+                scan_mode=scan_mode, seconds=round(time.perf_counter() - started, 3))
+
+def run_settings(suffix, scan_mode, sample_size):
+    """
+    Everything that changes what a run produces. A journal from a run with
+    other settings is not resumed.
+    """
+    return {
+        'suffix': suffix, 'scan_mode': scan_mode, 'sample_size': sample_size,
+        'colors': [list(color) for color in TARGET_COLORS], 'tolerance': COLOR_TOLERANCE,
+        'profile': OUTPUT_PROFILE, 'image_dpi': IMAGE_TARGET_DPI, 'dedup': DEDUP_MODE,
+    }
+
+def process_file(doc, filename, pdf_path, folder_path, suffix, scan_mode, sample_size, dedup_index, events):
+    """
+    Does the work for one open PDF. Returns (created, matched,
+    index_entries): whether a highlights PDF was written, whether the file
+    has our highlights, and the entries it added to the dedup index (None
+    if it didn't touch the index).
+    """
+    total_pages = len(doc)
+    events.emit('file_started', file=filename, pages=total_pages)
+
+    if scan_mode == 'probe':
+        first_match = probe_document(doc)
+        events.emit('file_probed', file=filename, pages=total_pages,
+                    first_match=None if first_match is None else first_match + 1)
+        return False, first_match is not None, None
+
+    if scan_mode == 'estimate':
+        result = estimate_document(doc, sample_size)
+        events.emit('file_estimated', file=filename, **result)
+        return False, result['estimate'] > 0, None
+
+    # Keep every page where any highlight is in one of our colors
+    pages_to_keep = find_highlighted_pages(doc, pdf_path)
+    for page_index in pages_to_keep:
+        events.emit('page_matched', file=filename, page=page_index + 1)
+
+    if not pages_to_keep:
+        events.emit('file_skipped', file=filename, pages=total_pages, reason='no_matches',
+                    matched=0, duplicates=0)
+        return False, False, None
+
+    # Remove duplicate page numbers (just in case)
+    unique_pages = sorted(list(set(pages_to_keep)))
+
+    output_filename = f"{os.path.splitext(filename)[0]}{suffix}"
+    output_filepath = os.path.join(folder_path, output_filename)
+
+    duplicates = []
+    new_entries = None
+    if DEDUP_MODE:
+        unique_pages, duplicates, new_entries = highlight_dedup.find_duplicate_pages(
+            doc, unique_pages, filename, output_filename, dedup_index, folder_path)
+        if not unique_pages:
+            highlight_dedup.record_pages(dedup_index, filename, new_entries)
+            events.emit('file_skipped', file=filename, pages=total_pages, reason='all_duplicates',
+                        matched=len(pages_to_keep), duplicates=len(duplicates))
+            return False, True, new_entries
+
+    new_doc = fitz.open() # Create a new empty PDF
+    new_doc.insert_pdf(doc, from_page=unique_pages[0], to_page=unique_pages[0]) # Start with the first page
+
+    # Insert the rest of the pages one by one
+    for page_index in unique_pages[1:]:
+        new_doc.insert_pdf(doc, from_page=page_index, to_page=page_index)
+
+    image_report = None
+    if IMAGE_TARGET_DPI:
+        image_report = optimize_images(new_doc, target_dpi=IMAGE_TARGET_DPI)
+
+    if duplicates and DEDUP_MODE == 'reference':
+        highlight_dedup.add_reference_page(new_doc, duplicates)
+
+    # Written to a temporary file and renamed, so it is never half there.
+    save_report = save_document(new_doc, output_filepath, OUTPUT_PROFILE)
+    new_doc.close()
+    if DEDUP_MODE:
+        highlight_dedup.record_pages(dedup_index, filename, new_entries)
 
-    print("--- 🏁 Processing Complete! ---")
-    if total_new_files > 0:
-        print(f"Created {total_new_files} new PDF file(s) in your TEXT folder.")
-    else:
-        print("No new PDFs were created. If you are sure you have yellow, green, or blue highlights,")
-        print("the color codes in the PDF might be slightly different. Let me know if this happens.")
+    events.emit('file_saved', file=filename, pages=total_pages, output=output_filename,
+                matched=len(pages_to_keep), kept=len(unique_pages), duplicates=len(duplicates),
+                images=image_report, size=save_report['size'], seconds=save_report['seconds'],
+                profile=save_report['profile'])
+    return True, True, new_entries
 
 # --- RUN THE SCRIPT ---
 if __name__ == '__main__':
-    create_pdf_from_specific_highlights(PDF_FOLDER_PATH, OUTPUT_SUFFIX)
+    create_pdf_from_specific_highlights(PDF_FOLDER_PATH, OUTPUT_SUFFIX, SCAN_MODE)
@@ -0,0 +1,52 @@
+import os
+import sys
+
+import fitz  # PyMuPDF
+import pytest
+
+# The highlight extractor lives at the top of the repo and the web toolkit
+# in Pdftools/, and both import their modules by plain name. The top level
+# goes first, so 'main' is the extractor (Pdftools has a main.py too).
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [ROOT, os.path.join(ROOT, 'Pdftools')]
+
+YELLOW = (1.0, 1.0, 0.0)
+RED = (1.0, 0.0, 0.0)
+
+def make_pdf(pages=3, highlights=None, text='Page {number}'):
+    """
+    Returns the bytes of a small PDF. 'highlights' maps 0-based page
+    numbers to the stroke color of a highlight put on that page.
+    """
+    doc = fitz.open()
+    for page_index in range(pages):
+        page = doc.new_page()
+        page.insert_text((72, 72), text.format(number=page_index + 1))
+        color = (highlights or {}).get(page_index)
+        if color is not None:
+            annot = page.add_highlight_annot(fitz.Rect(70, 60, 200, 80))
+            annot.set_colors(stroke=color)
+            annot.update()
+    data = doc.tobytes()
+    doc.close()
+    return data
+
+def page_count(pdf_bytes):
+    with fitz.open(stream=pdf_bytes, filetype='pdf') as doc:
+        return doc.page_count
+
+def page_texts(pdf_bytes):
+    with fitz.open(stream=pdf_bytes, filetype='pdf') as doc:
+        return [page.get_text().strip() for page in doc]
+
+@pytest.fixture
+def write_pdf(tmp_path):
+    """
+    Writes make_pdf(...) to 'relative_path' under tmp_path and returns its path.
+    """
+    def write(relative_path, **kwargs):
+        path = tmp_path / relative_path
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(make_pdf(**kwargs))
+        return path
+    return write
@@ -0,0 +1,77 @@
+import threading
+import time
+
+import pytest
+
+import admission
+import pdf_operations
+from conftest import make_pdf, page_count
+
+def nap(pdf_bytes, seconds):
+    time.sleep(seconds)
+    return len(pdf_bytes)
+
+def allocate(pdf_bytes, size):
+    return len(bytearray(size))
+
+def test_preflight_limits_pages_and_objects():
+    admission.preflight([make_pdf(3), make_pdf(3)], max_pages=6)
+    with pytest.raises(admission.AdmissionError, match='Too many pages'):
+        admission.preflight([make_pdf(3), make_pdf(4)], max_pages=6)
+    with pytest.raises(admission.AdmissionError, match='too complex'):
+        admission.preflight([make_pdf(3)], max_objects=3)
+
+def test_preflight_leaves_unreadable_files_to_the_operation():
+    admission.preflight([b'not a pdf'])
+
+def test_clients_are_limited_to_their_own_share(monkeypatch):
+    monkeypatch.setattr(admission, 'MAX_JOBS_PER_CLIENT', 1)
+    with admission.job_slot('alice'):
+        with pytest.raises(admission.BusyError):
+            with admission.job_slot('alice'):
+                pass
+        with admission.job_slot('bob'):
+            pass
+    with admission.job_slot('alice'):
+        pass
+
+def test_too_large_input_is_refused_before_any_work(monkeypatch):
+    monkeypatch.setattr(admission, 'MAX_INPUT_BYTES', 10)
+    with pytest.raises(admission.AdmissionError, match='larger than'):
+        admission.run_limited('alice', pdf_operations.number_pdf_bytes, make_pdf(1))
+
+def test_job_runs_in_its_own_process():
+    numbered, report = admission.run_limited('alice', pdf_operations.number_pdf_bytes, make_pdf(2))
+    assert page_count(numbered) == 2 and report['size'] == len(numbered)
+
+def test_errors_from_the_job_are_raised_as_they_are():
+    with pytest.raises(pdf_operations.InvalidPDFError):
+        admission.run_limited('alice', pdf_operations.merge_pdf_bytes, [make_pdf(1), b'junk'])
+
+def test_job_that_runs_too_long_is_stopped(monkeypatch):
+    monkeypatch.setattr(admission, 'JOB_WALL_SECONDS', 1)
+    started = time.monotonic()
+    with pytest.raises(admission.AdmissionError, match='too long'):
+        admission.run_limited('alice', nap, make_pdf(1), 30)
+    assert time.monotonic() - started < 10
+
+@pytest.mark.skipif(admission.resource is None, reason='needs resource limits')
+def test_job_over_the_memory_limit_fails_alone(monkeypatch):
+    monkeypatch.setattr(admission, 'JOB_MEMORY_BYTES', 512 * 1024 * 1024)
+    with pytest.raises(admission.AdmissionError, match='memory'):
+        admission.run_limited('alice', allocate, make_pdf(1), 1024 * 1024 * 1024)
+    assert admission.run_limited('alice', allocate, make_pdf(1), 1024) == 1024
+
+def test_waiting_for_a_slot_does_not_count_against_the_job(monkeypatch):
+    monkeypatch.setattr(admission, 'JOB_WALL_SECONDS', 3)
+    monkeypatch.setattr(admission, '_running_slots', threading.BoundedSemaphore(1))
+    results = {}
+    def submit(client_id):
+        results[client_id] = admission.run_limited(client_id, nap, make_pdf(1), 2)
+
+    threads = [threading.Thread(target=submit, args=(client_id,)) for client_id in ('alice', 'bob')]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert sorted(results) == ['alice', 'bob']
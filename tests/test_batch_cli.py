@@ -0,0 +1,56 @@
+import os
+
+import pytest
+
+import batch_cli
+from conftest import page_count
+
+def test_same_names_from_different_folders_dont_collide(tmp_path, write_pdf):
+    write_pdf('in/a/book.pdf', pages=1)
+    write_pdf('in/b/book.pdf', pages=2)
+    out = tmp_path / 'out'
+
+    assert batch_cli.main(['number', str(tmp_path / 'in' / '*' / '*.pdf'), '-o', str(out), '-j', '1']) == 0
+    assert page_count((out / 'a' / 'book_numbered.pdf').read_bytes()) == 1
+    assert page_count((out / 'b' / 'book_numbered.pdf').read_bytes()) == 2
+
+def test_inputs_from_one_folder_keep_plain_names(tmp_path, write_pdf):
+    write_pdf('in/book.pdf', pages=3)
+    out = tmp_path / 'out'
+
+    assert batch_cli.main(['split', str(tmp_path / 'in' / 'book.pdf'), '-r', '1, 2-3', '-o', str(out), '-j', '1']) == 0
+    assert sorted(os.listdir(out)) == ['book_split_pages_1.pdf', 'book_split_pages_2-3.pdf']
+
+def test_the_same_file_given_twice_is_done_once(tmp_path, write_pdf):
+    path = write_pdf('book.pdf', pages=1)
+    relative = os.path.relpath(path)
+    assert batch_cli.collect_inputs([str(path), relative], []) == [str(path)]
+
+def test_merge_reports_a_missing_input(tmp_path, write_pdf):
+    write_pdf('a.pdf', pages=1)
+    output = tmp_path / 'merged.pdf'
+    assert batch_cli.main(['merge', str(tmp_path / 'a.pdf'), str(tmp_path / 'gone.pdf'), '-o', str(output)]) == 1
+    assert not output.exists()
+
+def test_merge_follows_the_manifest_order(tmp_path, write_pdf):
+    write_pdf('a.pdf', pages=1)
+    write_pdf('b.pdf', pages=2)
+    manifest = tmp_path / 'order.txt'
+    manifest.write_text('# cover last\nb.pdf\n\na.pdf\n', encoding='utf-8')
+    output = tmp_path / 'merged.pdf'
+
+    assert batch_cli.main(['merge', '-m', str(manifest), '-o', str(output)]) == 0
+    assert page_count(output.read_bytes()) == 3
+
+def test_split_that_selects_no_pages_fails(tmp_path, write_pdf):
+    write_pdf('book.pdf', pages=2)
+    out = tmp_path / 'out'
+    assert batch_cli.main(['split', str(tmp_path / 'book.pdf'), '-r', '5-9', '-o', str(out), '-j', '1']) == 1
+    assert os.listdir(out) == []
+
+def test_jobs_must_be_positive(tmp_path, write_pdf, capsys):
+    write_pdf('book.pdf', pages=1)
+    with pytest.raises(SystemExit) as exit_info:
+        batch_cli.main(['number', str(tmp_path / 'book.pdf'), '-o', str(tmp_path / 'out'), '-j', '0'])
+    assert exit_info.value.code == 2
+    assert '--jobs' in capsys.readouterr().err
@@ -0,0 +1,81 @@
+import hashlib
+import io
+import os
+import time
+
+import pytest
+
+import chunked_uploads
+
+@pytest.fixture(autouse=True)
+def upload_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(chunked_uploads, 'UPLOAD_DIR', str(tmp_path))
+    monkeypatch.setattr(chunked_uploads, 'CHUNK_SIZE', 4)
+    return tmp_path
+
+def new_upload(size=10):
+    return chunked_uploads.create_upload('book.pdf', size)['upload_id']
+
+def test_chunks_in_any_order_make_the_file():
+    upload_id = new_upload()
+    for offset, data in ((8, b'IJ'), (0, b'ABCD'), (4, b'EFGH')):
+        chunked_uploads.write_chunk(upload_id, offset, io.BytesIO(data))
+
+    filename, spool_path = chunked_uploads.finalize_upload(upload_id)
+    assert filename == 'book.pdf'
+    with open(spool_path, 'rb') as spool:
+        assert spool.read() == b'ABCDEFGHIJ'
+
+def test_unfinished_upload_is_not_handed_out():
+    upload_id = new_upload()
+    chunked_uploads.write_chunk(upload_id, 0, io.BytesIO(b'ABCD'))
+    assert chunked_uploads.upload_status(upload_id)['received_offsets'] == [0]
+    with pytest.raises(ValueError, match='not complete'):
+        chunked_uploads.finalize_upload(upload_id)
+
+@pytest.mark.parametrize('filename, size', [('book.txt', 10), ('book.pdf', 0), ('book.pdf', '10')])
+def test_bad_uploads_are_refused(filename, size):
+    with pytest.raises(ValueError):
+        chunked_uploads.create_upload(filename, size)
+
+@pytest.mark.parametrize('offset', [-4, 3, 12])
+def test_bad_offsets_are_refused(offset):
+    with pytest.raises(ValueError, match='offset'):
+        chunked_uploads.write_chunk(new_upload(), offset, io.BytesIO(b'ABCD'))
+
+def test_checksum_mismatch_is_not_marked_received():
+    upload_id = new_upload()
+    with pytest.raises(ValueError, match='checksum'):
+        chunked_uploads.write_chunk(upload_id, 0, io.BytesIO(b'ABCD'), hashlib.sha256(b'WXYZ').hexdigest())
+    assert chunked_uploads.upload_status(upload_id)['received_offsets'] == []
+
+def test_resent_chunk_that_breaks_off_is_no_longer_received():
+    upload_id = new_upload()
+    chunked_uploads.write_chunk(upload_id, 0, io.BytesIO(b'ABCD'))
+    with pytest.raises(ValueError, match='incomplete'):
+        chunked_uploads.write_chunk(upload_id, 0, io.BytesIO(b'ZZ'))
+    assert chunked_uploads.upload_status(upload_id)['received_offsets'] == []
+
+def test_unknown_ids_are_refused():
+    for upload_id in ('0' * 32, '../etc/passwd'):
+        with pytest.raises(ValueError, match='Unknown'):
+            chunked_uploads.upload_status(upload_id)
+
+def test_discard_removes_everything(upload_dir):
+    upload_id = new_upload()
+    chunked_uploads.discard_upload(upload_id)
+    assert os.listdir(upload_dir) == []
+
+def test_abandoned_uploads_expire(upload_dir):
+    old_id, fresh_id = new_upload(), new_upload()
+    for path in chunked_uploads._upload_paths(old_id):
+        os.utime(path, (0, 0))
+
+    chunked_uploads.remove_expired_uploads(now=time.time())
+    assert sorted(os.listdir(upload_dir)) == sorted(fresh_id + ext for ext in ('.json', '.parts', '.spool'))
+
+def test_pending_uploads_are_capped(monkeypatch):
+    monkeypatch.setattr(chunked_uploads, 'MAX_PENDING_UPLOADS', 1)
+    new_upload()
+    with pytest.raises(ValueError, match='Too many uploads'):
+        new_upload()
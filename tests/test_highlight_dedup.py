@@ -0,0 +1,94 @@
+import os
+
+import pytest
+
+import highlight_dedup
+import highlight_events
+import main
+from conftest import YELLOW
+
+@pytest.fixture
+def dedup_run(monkeypatch):
+    monkeypatch.setattr(main, 'RESUME', False)
+    monkeypatch.setattr(main, 'DEDUP_MODE', 'skip')
+    monkeypatch.setattr(main, 'PAGE_WORKERS', 1)
+
+    def run(folder):
+        records = []
+        main.create_pdf_from_specific_highlights(str(folder), '_hl.pdf',
+                                                 events=highlight_events.EventStream([records.append]))
+        return records
+    return run
+
+def test_second_copy_is_skipped(tmp_path, write_pdf, dedup_run):
+    write_pdf('a.pdf', pages=3, highlights={1: YELLOW})
+    write_pdf('b.pdf', pages=3, highlights={1: YELLOW})
+
+    records = dedup_run(tmp_path)
+    skipped = [r for r in records if r['event'] == 'file_skipped']
+    assert [(r['file'], r['reason']) for r in skipped] == [('b.pdf', 'all_duplicates')]
+    assert (tmp_path / 'a_hl.pdf').exists() and not (tmp_path / 'b_hl.pdf').exists()
+
+def test_rerun_does_not_count_a_file_as_its_own_copy(tmp_path, write_pdf, dedup_run):
+    write_pdf('a.pdf', pages=2, highlights={0: YELLOW})
+    dedup_run(tmp_path)
+    records = dedup_run(tmp_path)
+    assert [r['file'] for r in records if r['event'] == 'file_saved'] == ['a.pdf']
+
+def test_failed_save_leaves_the_index_alone(tmp_path, write_pdf, dedup_run, monkeypatch):
+    write_pdf('a.pdf', pages=3, highlights={1: YELLOW})
+    write_pdf('b.pdf', pages=3, highlights={1: YELLOW})
+
+    real_save = main.save_document
+    def failing_for_a(doc, path, profile):
+        if os.path.basename(path) == 'a_hl.pdf':
+            raise OSError('disk full')
+        return real_save(doc, path, profile)
+    monkeypatch.setattr(main, 'save_document', failing_for_a)
+
+    records = dedup_run(tmp_path)
+    assert [r['file'] for r in records if r['event'] == 'error'] == ['a.pdf']
+    assert [r['file'] for r in records if r['event'] == 'file_saved'] == ['b.pdf']
+    index = highlight_dedup.load_index(str(tmp_path))
+    assert {entry['output'] for entry in index['pages'].values()} == {'b_hl.pdf'}
+
+def test_find_duplicate_pages_does_not_change_the_index(tmp_path, write_pdf):
+    import fitz
+    index = {'pages': {}}
+    with fitz.open(str(write_pdf('a.pdf', pages=2, highlights={0: YELLOW, 1: YELLOW}))) as doc:
+        keep, duplicates, new_entries = highlight_dedup.find_duplicate_pages(
+            doc, [0, 1], 'a.pdf', 'a_hl.pdf', index, str(tmp_path))
+    assert keep == [0, 1] and duplicates == []
+    assert index == {'pages': {}}
+
+    highlight_dedup.record_pages(index, 'a.pdf', new_entries)
+    assert sorted(entry['page'] for entry in index['pages'].values()) == [1, 2]
+
+def test_pages_are_kept_when_the_first_copy_is_gone(tmp_path, write_pdf, dedup_run):
+    write_pdf('a.pdf', pages=3, highlights={1: YELLOW})
+    write_pdf('b.pdf', pages=3, highlights={1: YELLOW})
+    dedup_run(tmp_path)
+    (tmp_path / 'a.pdf').unlink()
+    (tmp_path / 'a_hl.pdf').unlink()
+
+    records = dedup_run(tmp_path)
+    assert [r['file'] for r in records if r['event'] == 'file_saved'] == ['b.pdf']
+    index = highlight_dedup.load_index(str(tmp_path))
+    assert {entry['source'] for entry in index['pages'].values()} == {'b.pdf'}
+
+def test_entries_from_a_changed_source_are_dropped(tmp_path, write_pdf):
+    import fitz
+    write_pdf('a.pdf', pages=2, highlights={0: YELLOW})
+    write_pdf('b.pdf', pages=2, highlights={0: YELLOW})
+    index = {'pages': {}}
+    with fitz.open(str(tmp_path / 'a.pdf')) as doc:
+        _, _, new_entries = highlight_dedup.find_duplicate_pages(doc, [0], 'a.pdf', 'a_hl.pdf', index, str(tmp_path))
+    highlight_dedup.record_pages(index, 'a.pdf', new_entries)
+    (tmp_path / 'a_hl.pdf').write_bytes(b'%PDF')
+
+    with fitz.open(str(tmp_path / 'b.pdf')) as doc:
+        assert highlight_dedup.find_duplicate_pages(doc, [0], 'b.pdf', 'b_hl.pdf', index, str(tmp_path))[1] != []
+        write_pdf('a.pdf', pages=3, highlights={0: YELLOW})
+        keep, duplicates, _ = highlight_dedup.find_duplicate_pages(doc, [0], 'b.pdf', 'b_hl.pdf', index, str(tmp_path))
+    assert keep == [0] and duplicates == []
+    assert index == {'pages': {}}
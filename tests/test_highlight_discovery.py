@@ -0,0 +1,62 @@
+import os
+
+import highlight_discovery
+
+def touch(root, *relative_paths):
+    for relative_path in relative_paths:
+        path = root / relative_path
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(b'%PDF-1.4')
+
+def found(root, **kwargs):
+    return list(highlight_discovery.iter_pdf_files(str(root), '_hl.pdf', **kwargs))
+
+def test_top_folder_only_by_default(tmp_path):
+    touch(tmp_path, 'b.pdf', 'a.PDF', 'notes.txt', 'sub/c.pdf')
+    assert found(tmp_path) == ['a.PDF', 'b.pdf']
+
+def test_recursive_order_is_stable(tmp_path):
+    touch(tmp_path, 'z.pdf', 'b/2.pdf', 'b/1.pdf', 'a/x.pdf', 'a/deep/y.pdf')
+    assert found(tmp_path, recursive=True) == ['z.pdf', 'a/x.pdf', 'a/deep/y.pdf', 'b/1.pdf', 'b/2.pdf']
+
+def test_outputs_and_hidden_files_are_skipped(tmp_path):
+    touch(tmp_path, 'a.pdf', 'a_hl.pdf', '.a.pdf.123.tmp', '.hidden/b.pdf')
+    assert found(tmp_path, recursive=True) == ['a.pdf']
+
+def test_include_and_exclude_patterns(tmp_path):
+    touch(tmp_path, 'book.pdf', 'book draft.pdf', 'Scans/page.pdf')
+    assert found(tmp_path, recursive=True, exclude=['*draft*']) == ['book.pdf', 'Scans/page.pdf']
+    assert found(tmp_path, recursive=True, include=['scans/*']) == ['Scans/page.pdf']
+
+def test_excluded_folders_are_not_entered(tmp_path, monkeypatch):
+    touch(tmp_path, 'a.pdf', 'Old/b.pdf', 'Old/deeper/c.pdf', 'Drafts/d.pdf')
+    listed = []
+    real_scandir = os.scandir
+    def recording_scandir(path):
+        listed.append(os.path.relpath(path, tmp_path))
+        return real_scandir(path)
+    monkeypatch.setattr(highlight_discovery.os, 'scandir', recording_scandir)
+
+    assert found(tmp_path, recursive=True, exclude=['Old/*', 'drafts']) == ['a.pdf']
+    assert listed == ['.']
+
+def test_size_and_date_limits(tmp_path):
+    touch(tmp_path, 'small.pdf')
+    (tmp_path / 'big.pdf').write_bytes(b'x' * 5000)
+    os.utime(tmp_path / 'small.pdf', (0, 0))
+    assert found(tmp_path, min_size=1000) == ['big.pdf']
+    assert found(tmp_path, modified_after='2000-01-01') == ['big.pdf']
+    assert found(tmp_path, modified_before='2000-01-01') == ['small.pdf']
+
+def test_unreadable_subfolder_is_reported_and_skipped(tmp_path, monkeypatch):
+    touch(tmp_path, 'a.pdf', 'locked/b.pdf')
+    real_scandir = os.scandir
+    def failing_scandir(path):
+        if path.endswith('locked'):
+            raise PermissionError('no access')
+        return real_scandir(path)
+    monkeypatch.setattr(highlight_discovery.os, 'scandir', failing_scandir)
+
+    errors = []
+    assert found(tmp_path, recursive=True, on_error=lambda d, e: errors.append(d)) == ['a.pdf']
+    assert errors == ['locked']
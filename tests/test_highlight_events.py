@@ -0,0 +1,141 @@
+import io
+import json
+
+import highlight_events
+
+class Stream(io.StringIO):
+    """
+    A StringIO that counts its writes and can pretend to be a terminal.
+    """
+
+    def __init__(self, tty=False):
+        super().__init__()
+        self.tty = tty
+        self.writes = 0
+
+    def isatty(self):
+        return self.tty
+
+    def write(self, text):
+        self.writes += 1
+        return super().write(text)
+
+def record(event, **fields):
+    return {'event': event, 'time': 0.0, **fields}
+
+SAVED = record('file_saved', file='a.pdf', pages=3, output='a_hl.pdf', matched=2, kept=2, duplicates=0,
+               images=None, size=2048, seconds=0.5, profile='fast')
+
+def test_console_writes_once_per_file():
+    stream = Stream()
+    sink = highlight_events.ConsoleSink(stream, show_pages=True)
+    sink(record('file_started', file='a.pdf', pages=3))
+    sink(record('page_matched', file='a.pdf', page=1))
+    sink(record('page_matched', file='a.pdf', page=3))
+    assert stream.writes == 0
+
+    sink(SAVED)
+    assert stream.writes == 1
+    output = stream.getvalue()
+    assert 'Match found on Page 1' in output and 'Match found on Page 3' in output
+    assert 'Successfully saved: a_hl.pdf (2 KB' in output
+
+def test_console_leaves_out_page_lines_when_not_a_terminal():
+    stream = Stream(tty=False)
+    sink = highlight_events.ConsoleSink(stream)
+    sink(record('file_started', file='a.pdf', pages=3))
+    sink(record('page_matched', file='a.pdf', page=1))
+    sink(SAVED)
+    assert 'Match found' not in stream.getvalue()
+
+    stream = Stream(tty=True)
+    sink = highlight_events.ConsoleSink(stream)
+    sink(record('file_started', file='a.pdf', pages=3))
+    sink(record('page_matched', file='a.pdf', page=1))
+    sink(SAVED)
+    assert 'Match found on Page 1' in stream.getvalue()
+
+def test_console_sums_up_resumed_files_in_one_line():
+    stream = Stream()
+    sink = highlight_events.ConsoleSink(stream)
+    for name in ('a.pdf', 'b.pdf', 'c.pdf'):
+        sink(record('file_resumed', file=name))
+    assert stream.getvalue() == ''
+
+    sink(record('file_started', file='d.pdf', pages=3))
+    sink(record('file_skipped', file='d.pdf', pages=3, reason='no_matches', matched=0, duplicates=0))
+    output = stream.getvalue()
+    assert output.count('Resuming an interrupted run') == 1 and '3 file(s) were already done' in output
+
+def test_console_names_a_file_that_failed_before_it_started():
+    stream = Stream()
+    sink = highlight_events.ConsoleSink(stream)
+    sink(record('error', file='bad.pdf', message='cannot open'))
+    sink(record('error', file=None, message='Permission denied'))
+    output = stream.getvalue()
+    assert "--- 📖 Processing: bad.pdf ---" in output
+    assert "An error occurred while processing 'bad.pdf': cannot open" in output
+    assert 'ERROR accessing folder: Permission denied' in output
+
+def test_progress_bar_counts_files_and_estimates_time_left(monkeypatch):
+    clock = iter([0.0, 0.0, 0.0, 10.0, 20.0, 30.0])
+    monkeypatch.setattr(highlight_events.time, 'perf_counter', lambda: next(clock))
+    stream = Stream()
+    bar = highlight_events.ProgressBar(stream, width=10, interval=0)
+
+    bar(record('run_started', folder='.', files=4, scan_mode='full'))
+    bar(record('file_saved', file='a.pdf', pages=60))
+    bar(record('error', file='b.pdf', message='cannot open'))
+    line = stream.getvalue().rsplit('\r', 1)[-1]
+    # Two of four files done in 20s: 20s to go, 60 pages in 20s.
+    assert line.startswith('[#####-----] 2/4 files | ETA 0m20s | 3 pages/s')
+
+    bar(record('run_summary', files=4, created=1, with_matches=1, scan_mode='full', seconds=30.0))
+    assert stream.getvalue().endswith('\nDone: 4 file(s), 1 created, 1 error(s) in 30.0s\n')
+
+def test_progress_bar_is_clamped_and_works_without_a_total():
+    stream = Stream()
+    bar = highlight_events.ProgressBar(stream, width=4, interval=0)
+    bar(record('run_started', folder='.', files=1, scan_mode='full'))
+    bar(record('file_saved', file='a.pdf', pages=1))
+    bar(record('file_saved', file='b.pdf', pages=1))  # Found after the count
+    assert stream.getvalue().rsplit('\r', 1)[-1].startswith('[####] 2/1 files |')
+
+    stream = Stream()
+    bar = highlight_events.ProgressBar(stream, interval=0)
+    bar(record('run_started', folder='.', files=None, scan_mode='full'))
+    bar(record('file_saved', file='a.pdf', pages=1))
+    assert stream.getvalue().rsplit('\r', 1)[-1].startswith('1 files |')
+
+def test_progress_bar_ignores_run_level_errors():
+    stream = Stream()
+    bar = highlight_events.ProgressBar(stream, interval=0)
+    bar(record('run_started', folder='.', files=2, scan_mode='full'))
+    bar(record('error', file=None, message='journal'))
+    assert bar.done == 0 and bar.errors == 0
+
+def test_jsonl_log_is_flushed_when_a_file_is_done(tmp_path):
+    path = tmp_path / 'events.jsonl'
+    sink = highlight_events.JsonlSink(str(path))
+    sink(record('file_started', file='a.pdf', pages=3))
+    sink(record('page_matched', file='a.pdf', page=1))
+    assert path.read_text(encoding='utf-8') == ''
+
+    sink(SAVED)
+    lines = path.read_text(encoding='utf-8').splitlines()
+    assert [json.loads(line)['event'] for line in lines] == ['file_started', 'page_matched', 'file_saved']
+    sink.close()
+
+def test_stream_closes_only_sinks_that_can_be_closed():
+    closed = []
+    class Closable:
+        def __call__(self, record):
+            pass
+        def close(self):
+            closed.append(True)
+    records = []
+    events = highlight_events.EventStream([records.append, Closable()])
+    events.emit('run_started', folder='.', files=0, scan_mode='full')
+    events.close()
+    assert records[0]['event'] == 'run_started' and 'time' in records[0]
+    assert closed == [True]
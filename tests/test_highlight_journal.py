@@ -0,0 +1,138 @@
+import os
+
+import pytest
+
+import highlight_dedup
+import highlight_events
+import highlight_journal
+import main
+from conftest import YELLOW
+
+SETTINGS = {'suffix': '_hl.pdf', 'scan_mode': 'full'}
+
+def test_finished_files_are_remembered(tmp_path, write_pdf):
+    pdf_path = write_pdf('a.pdf', pages=1)
+    journal = highlight_journal.Journal(str(tmp_path), SETTINGS)
+    journal.record('a.pdf', str(pdf_path), True, True)
+    journal.close()
+
+    resumed = highlight_journal.Journal(str(tmp_path), SETTINGS)
+    assert resumed.finished_before('a.pdf', str(pdf_path))['created'] is True
+    assert resumed.finished_before('b.pdf', str(pdf_path)) is None
+
+def test_other_settings_start_over(tmp_path, write_pdf):
+    pdf_path = write_pdf('a.pdf', pages=1)
+    journal = highlight_journal.Journal(str(tmp_path), SETTINGS)
+    journal.record('a.pdf', str(pdf_path), True, True)
+    journal.close()
+
+    resumed = highlight_journal.Journal(str(tmp_path), dict(SETTINGS, scan_mode='probe'))
+    assert resumed.finished_before('a.pdf', str(pdf_path)) is None
+
+def test_changed_file_is_done_again(tmp_path, write_pdf):
+    pdf_path = write_pdf('a.pdf', pages=1)
+    journal = highlight_journal.Journal(str(tmp_path), SETTINGS)
+    journal.record('a.pdf', str(pdf_path), True, True)
+    journal.close()
+    write_pdf('a.pdf', pages=2)
+
+    resumed = highlight_journal.Journal(str(tmp_path), SETTINGS)
+    assert resumed.finished_before('a.pdf', str(pdf_path)) is None
+
+def test_torn_last_line_is_ignored(tmp_path, write_pdf):
+    pdf_path = write_pdf('a.pdf', pages=1)
+    journal = highlight_journal.Journal(str(tmp_path), SETTINGS)
+    journal.record('a.pdf', str(pdf_path), False, False)
+    journal.close()
+    with open(journal.path, 'a', encoding='utf-8') as f:
+        f.write('{"file": "b.p')
+
+    resumed = highlight_journal.Journal(str(tmp_path), SETTINGS)
+    assert resumed.finished_before('a.pdf', str(pdf_path)) is not None
+
+def test_finish_removes_the_journal(tmp_path):
+    journal = highlight_journal.Journal(str(tmp_path), SETTINGS)
+    journal.finish()
+    assert not os.path.exists(journal.path)
+
+def test_interrupted_run_resumes_where_it_stopped(tmp_path, write_pdf, monkeypatch):
+    write_pdf('a.pdf', pages=2, highlights={0: YELLOW})
+    write_pdf('b.pdf', pages=2, highlights={1: YELLOW})
+    monkeypatch.setattr(main, 'RESUME', True)
+    monkeypatch.setattr(main, 'DEDUP_MODE', None)
+    monkeypatch.setattr(main, 'PAGE_WORKERS', 1)
+
+    real_save = main.save_document
+    def save_then_stop(doc, path, profile):
+        if os.path.basename(path).startswith('b'):
+            raise KeyboardInterrupt
+        return real_save(doc, path, profile)
+    monkeypatch.setattr(main, 'save_document', save_then_stop)
+    with pytest.raises(KeyboardInterrupt):
+        main.create_pdf_from_specific_highlights(str(tmp_path), '_hl.pdf', events=highlight_events.EventStream([]))
+    assert (tmp_path / highlight_journal.JOURNAL_FILENAME).exists()
+
+    monkeypatch.setattr(main, 'save_document', real_save)
+    records = []
+    main.create_pdf_from_specific_highlights(str(tmp_path), '_hl.pdf', events=highlight_events.EventStream([records.append]))
+    events = [(r['event'], r.get('file')) for r in records if r.get('file')]
+    assert ('file_resumed', 'a.pdf') in events and ('file_saved', 'b.pdf') in events
+    assert records[-1]['created'] == 2
+    assert not (tmp_path / highlight_journal.JOURNAL_FILENAME).exists()
+
+@pytest.mark.parametrize('scan_mode', ['full', 'probe'])
+def test_run_carries_on_when_the_journal_cant_be_written(tmp_path, write_pdf, monkeypatch, scan_mode):
+    write_pdf('a.pdf', pages=2, highlights={0: YELLOW})
+    monkeypatch.setattr(main, 'RESUME', True)
+    monkeypatch.setattr(main, 'DEDUP_MODE', None)
+    def read_only_open(path, *args, **kwargs):
+        raise PermissionError(13, 'Read-only file system', path)
+    monkeypatch.setattr(highlight_journal, 'open', read_only_open, raising=False)
+
+    records = []
+    main.create_pdf_from_specific_highlights(str(tmp_path), '_hl.pdf', scan_mode,
+                                             events=highlight_events.EventStream([records.append]))
+    errors = [r for r in records if r['event'] == 'error']
+    assert len(errors) == 1 and errors[0]['file'] is None and 'journal' in errors[0]['message']
+    assert records[-1]['event'] == 'run_summary' and records[-1]['with_matches'] == 1
+
+def test_journal_that_fails_midway_is_dropped(tmp_path, write_pdf, monkeypatch):
+    write_pdf('a.pdf', pages=1, highlights={0: YELLOW})
+    write_pdf('b.pdf', pages=1, highlights={0: YELLOW})
+    monkeypatch.setattr(main, 'RESUME', True)
+    monkeypatch.setattr(main, 'DEDUP_MODE', None)
+    def disk_full(self, *args):
+        raise OSError(28, 'No space left on device')
+    monkeypatch.setattr(highlight_journal.Journal, 'record', disk_full)
+
+    records = []
+    main.create_pdf_from_specific_highlights(str(tmp_path), '_hl.pdf', events=highlight_events.EventStream([records.append]))
+    assert len([r for r in records if r['event'] == 'error']) == 1
+    assert records[-1]['created'] == 2
+
+def test_resumed_run_rebuilds_the_dedup_index_from_the_journal(tmp_path, write_pdf, monkeypatch):
+    write_pdf('a.pdf', pages=2, highlights={0: YELLOW})
+    write_pdf('b.pdf', pages=2, highlights={0: YELLOW})
+    write_pdf('c.pdf', pages=2, highlights={1: YELLOW})
+    monkeypatch.setattr(main, 'RESUME', True)
+    monkeypatch.setattr(main, 'DEDUP_MODE', 'skip')
+    monkeypatch.setattr(main, 'PAGE_WORKERS', 1)
+    saves = []
+    real_save_index = highlight_dedup.save_index
+    monkeypatch.setattr(highlight_dedup, 'save_index', lambda *args: saves.append(args) or real_save_index(*args))
+
+    real_save = main.save_document
+    def stop_at_c(doc, path, profile):
+        if os.path.basename(path).startswith('c'):
+            raise KeyboardInterrupt
+        return real_save(doc, path, profile)
+    monkeypatch.setattr(main, 'save_document', stop_at_c)
+    with pytest.raises(KeyboardInterrupt):
+        main.create_pdf_from_specific_highlights(str(tmp_path), '_hl.pdf', events=highlight_events.EventStream([]))
+    assert saves == []  # Nothing but the journal is written per file
+
+    monkeypatch.setattr(main, 'save_document', real_save)
+    main.create_pdf_from_specific_highlights(str(tmp_path), '_hl.pdf', events=highlight_events.EventStream([]))
+    assert len(saves) == 1
+    index = highlight_dedup.load_index(str(tmp_path))
+    assert sorted(entry['source'] for entry in index['pages'].values()) == ['a.pdf', 'c.pdf']
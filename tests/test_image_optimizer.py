@@ -0,0 +1,81 @@
+import zlib
+
+import fitz  # PyMuPDF
+import pytest
+
+import image_optimizer
+
+SIZE = 400  # Pixels; drawn on a one-inch page, so shown at 400 dpi
+
+@pytest.fixture(autouse=True)
+def every_image_counts(monkeypatch):
+    monkeypatch.setattr(image_optimizer, 'MIN_IMAGE_BYTES', 0)
+
+def gradient(components):
+    return bytes(x * 255 // SIZE for y in range(SIZE) for x in range(SIZE) for _ in range(components))
+
+def image_document(stream, image_filter, colorspace='/DeviceGray', extra=''):
+    """
+    A one-page document showing one image XObject across the whole page.
+    Returns (doc, image_xref).
+    """
+    doc = fitz.open()
+    page = doc.new_page(width=72, height=72)
+    xref = doc.get_new_xref()
+    doc.update_object(xref, f'<< /Type /XObject /Subtype /Image /Width {SIZE} /Height {SIZE} '
+                            f'/ColorSpace {colorspace} /BitsPerComponent 8 {extra} /Length 0 >>')
+    doc.update_stream(xref, stream, compress=False)
+    doc.xref_set_key(xref, 'Filter', image_filter)
+
+    contents = doc.get_new_xref()
+    doc.update_object(contents, '<< /Length 0 >>')
+    doc.update_stream(contents, b'q 72 0 0 72 0 0 cm /Im0 Do Q')
+    doc.xref_set_key(page.xref, 'Resources', f'<< /XObject << /Im0 {xref} 0 R >> >>')
+    doc.xref_set_key(page.xref, 'Contents', f'{contents} 0 R')
+    return doc, xref
+
+def rendered_tones(doc):
+    pix = doc[0].get_pixmap(dpi=72, colorspace=fitz.csGRAY)
+    return [pix.pixel(x, 36)[0] for x in (5, 20, 36, 52, 66)]
+
+def assert_looks_the_same(before, after):
+    assert all(abs(a - b) <= 12 for a, b in zip(before, after)), (before, after)
+
+def test_large_image_is_downsampled_and_looks_the_same():
+    doc, xref = image_document(zlib.compress(gradient(3), 0), '/FlateDecode', '/DeviceRGB')
+    before = rendered_tones(doc)
+
+    report = image_optimizer.optimize_images(doc, target_dpi=150, workers=1)
+    assert report['images'] == 1 and report['bytes_after'] < report['bytes_before']
+    assert doc.xref_get_key(xref, 'Filter')[1] == '/DCTDecode'
+    assert doc.xref_get_key(xref, 'Width')[1] == '150'
+    assert_looks_the_same(before, rendered_tones(doc))
+
+def test_inverted_gray_scan_keeps_its_tones_and_stays_gray():
+    doc, xref = image_document(zlib.compress(gradient(1), 0), '/FlateDecode', extra='/Decode [1 0]')
+    before = rendered_tones(doc)
+
+    assert image_optimizer.optimize_images(doc, target_dpi=150, workers=1)['images'] == 1
+    assert doc.xref_get_key(xref, 'ColorSpace')[1] == '/DeviceGray'
+    assert doc.xref_get_key(xref, 'Decode')[0] == 'null'
+    assert_looks_the_same(before, rendered_tones(doc))
+
+def test_inverted_jpeg_is_left_alone():
+    jpeg = fitz.Pixmap(fitz.csGRAY, SIZE, SIZE, gradient(1), 0).tobytes('jpeg', jpg_quality=95)
+    doc, xref = image_document(jpeg, '/DCTDecode', extra='/Decode [1 0]')
+    assert image_optimizer.optimize_images(doc, target_dpi=150, workers=1)['images'] == 0
+    assert doc.xref_stream_raw(xref) == jpeg
+
+def test_colour_key_masked_image_is_left_alone():
+    doc, xref = image_document(zlib.compress(gradient(1), 0), '/FlateDecode', extra='/Mask [0 10]')
+    assert image_optimizer.optimize_images(doc, target_dpi=150, workers=1)['images'] == 0
+    assert doc.xref_get_key(xref, 'Filter')[1] == '/FlateDecode'
+
+def test_image_shown_below_the_target_is_left_alone():
+    doc, _ = image_document(zlib.compress(gradient(1), 0), '/FlateDecode')
+    assert image_optimizer.optimize_images(doc, target_dpi=600, workers=1)['images'] == 0
+
+def test_target_resolution_must_be_positive():
+    doc, _ = image_document(zlib.compress(gradient(1), 0), '/FlateDecode')
+    with pytest.raises(ValueError):
+        image_optimizer.optimize_images(doc, target_dpi=0)
@@ -0,0 +1,37 @@
+import os
+import time
+
+import pytest
+
+import output_store
+
+@pytest.fixture(autouse=True)
+def output_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(output_store, 'OUTPUT_DIR', str(tmp_path))
+    monkeypatch.setattr(output_store, '_last_cleanup', 0.0)
+    return tmp_path
+
+def test_identical_outputs_share_one_file(output_dir):
+    first = output_store.store_output(b'%PDF same', 'pdf')
+    assert output_store.store_output(b'%PDF same', 'pdf') == first
+    assert os.listdir(output_dir) == [first]
+    assert output_store.stored_output_path(first) == os.path.join(str(output_dir), first)
+
+def test_foreign_names_are_not_served():
+    assert output_store.stored_output_path('../secret.pdf') is None
+    assert output_store.stored_output_path('0' * 64 + '.pdf') is None
+
+def test_old_outputs_expire(output_dir):
+    stored_name = output_store.store_output(b'%PDF old', 'pdf')
+    output_store.remove_expired_outputs(now=time.time() + output_store.OUTPUT_MAX_AGE + 1)
+    assert output_store.stored_output_path(stored_name) is None
+
+def test_reused_output_is_not_expired_right_after(output_dir):
+    stored_name = output_store.store_output(b'%PDF reused', 'pdf')
+    path = output_store.stored_output_path(stored_name)
+    os.utime(path, (0, 0))
+    output_store._last_cleanup = 0.0
+
+    assert output_store.store_output(b'%PDF reused', 'pdf') == stored_name
+    assert output_store.stored_output_path(stored_name) == path
+    assert time.time() - os.path.getmtime(path) < output_store.OUTPUT_MAX_AGE
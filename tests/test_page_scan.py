@@ -0,0 +1,27 @@
+import fitz  # PyMuPDF
+
+import main
+from conftest import RED, YELLOW
+
+HIGHLIGHTED = [0, 4, 5, 9, 10, 23, 29]  # Includes pages on shard boundaries
+
+def test_sharded_scan_matches_the_serial_scan(write_pdf, monkeypatch):
+    highlights = {page: YELLOW for page in HIGHLIGHTED}
+    highlights[7] = RED
+    pdf_path = write_pdf('big.pdf', pages=30, highlights=highlights)
+    monkeypatch.setattr(main, 'MIN_PAGES_PER_SHARD', 5)
+
+    with fitz.open(str(pdf_path)) as doc:
+        assert main.find_highlighted_pages(doc, str(pdf_path), workers=1) == HIGHLIGHTED
+        # 3 workers x 4 = 12 shards, capped at 30 // 5 = 6 shards of 5 pages
+        assert main.find_highlighted_pages(doc, str(pdf_path), workers=3) == HIGHLIGHTED
+
+def test_each_shard_scans_only_its_own_pages(write_pdf):
+    pdf_path = write_pdf('big.pdf', pages=12, highlights={page: YELLOW for page in HIGHLIGHTED if page < 12})
+    assert main.scan_page_range(str(pdf_path), 4, 9) == [4, 5]
+    assert main.scan_page_range(str(pdf_path), 9, 12) == [9, 10]
+
+def test_document_without_annotations_is_not_scanned(write_pdf):
+    pdf_path = write_pdf('plain.pdf', pages=3)
+    with fitz.open(str(pdf_path)) as doc:
+        assert main.find_highlighted_pages(doc, str(pdf_path), workers=4) == []
@@ -0,0 +1,81 @@
+import io
+import zipfile
+
+import pytest
+
+import output_profiles
+import pdf_operations
+from conftest import make_pdf, page_count, page_texts
+
+def test_merge_keeps_input_order():
+    merged, report = pdf_operations.merge_pdf_bytes(
+        [make_pdf(2, text='A{number}'), make_pdf(1, text='B{number}')])
+    assert page_texts(merged) == ['A1', 'A2', 'B1']
+    assert report['size'] == len(merged)
+
+def test_merge_with_nothing_returns_none():
+    assert pdf_operations.merge_pdf_bytes([]) == (None, None)
+
+def test_merge_rejects_unreadable_input():
+    with pytest.raises(pdf_operations.InvalidPDFError):
+        pdf_operations.merge_pdf_bytes([make_pdf(1), b'not a pdf'])
+
+def test_number_adds_page_numbers():
+    numbered, _ = pdf_operations.number_pdf_bytes(make_pdf(3))
+    assert [text.split()[-1] for text in page_texts(numbered)] == ['1', '2', '3']
+
+def test_parse_page_ranges():
+    parsed = pdf_operations.parse_page_ranges('1-3, 5')
+    assert [(label, list(pages)) for label, pages in parsed] == [('1-3', [0, 1, 2]), ('5', [4])]
+    with pytest.raises(ValueError):
+        pdf_operations.parse_page_ranges('one-two')
+
+def test_split_skips_ranges_outside_the_document():
+    parts, report = pdf_operations.split_pdf_bytes(make_pdf(4), '1-2, 4, 9')
+    assert [name for name, _ in parts] == ['split_pages_1-2.pdf', 'split_pages_4.pdf']
+    assert [page_count(data) for _, data in parts] == [2, 1]
+    assert report['size'] == sum(len(data) for _, data in parts)
+
+def test_zip_files():
+    with zipfile.ZipFile(io.BytesIO(pdf_operations.zip_files([('a.pdf', b'1'), ('b.pdf', b'2')]))) as archive:
+        assert archive.namelist() == ['a.pdf', 'b.pdf']
+
+def test_pipeline_selects_numbers_and_merges():
+    operations = [{'op': 'select_pages', 'ranges': '2-3'}, {'op': 'add_page_numbers'},
+                  {'op': 'merge', 'inputs': [1], 'position': 'start'}]
+    output, _ = pdf_operations.run_pipeline(
+        [make_pdf(3, text='Body {number}'), make_pdf(1, text='Cover')], operations)
+    texts = page_texts(output)
+    assert texts[0] == 'Cover'
+    assert [text.split()[:2] for text in texts[1:]] == [['Body', '2'], ['Body', '3']]
+
+@pytest.mark.parametrize('operations, message', [
+    ([], 'at least one operation'),
+    ([{'op': 'rotate'}], 'unknown operation'),
+    ([{'op': 'merge', 'inputs': [5]}], 'between 1 and 1'),
+    ([{'op': 'optimize_images', 'dpi': 0}], "positive 'dpi'"),
+])
+def test_check_pipeline_rejects_bad_steps(operations, message):
+    with pytest.raises(ValueError, match=message):
+        pdf_operations.check_pipeline(operations, 2)
+
+def test_pipeline_reports_which_input_is_unreadable():
+    with pytest.raises(pdf_operations.InvalidPDFError, match='Input 1 '):
+        pdf_operations.run_pipeline([make_pdf(1), b'junk'], [{'op': 'add_page_numbers'}])
+
+def test_unknown_profile_is_refused():
+    with pytest.raises(ValueError):
+        output_profiles.check_profile('tiny')
+
+def test_web_profile_saves_without_linearization_when_unsupported(tmp_path):
+    import fitz
+    with fitz.open(stream=make_pdf(1), filetype='pdf') as doc:
+        report = output_profiles.save_document(doc, str(tmp_path / 'out.pdf'), 'web')
+    assert report['linearized'] == output_profiles.linearization_supported()
+    assert report['size'] == (tmp_path / 'out.pdf').stat().st_size
+
+def test_save_errors_are_not_hidden_by_the_linearization_check(tmp_path):
+    import fitz
+    with fitz.open(stream=make_pdf(1), filetype='pdf') as doc:
+        with pytest.raises(OSError):
+            output_profiles.save_document(doc, str(tmp_path / 'missing' / 'out.pdf'), 'web')
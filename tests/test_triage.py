@@ -0,0 +1,77 @@
+import fitz  # PyMuPDF
+import pytest
+
+import highlight_events
+import main
+from conftest import RED, YELLOW, make_pdf
+
+def open_pdf(**kwargs):
+    return fitz.open(stream=make_pdf(**kwargs), filetype='pdf')
+
+def test_probe_stops_at_the_first_match(monkeypatch):
+    checked = []
+    real_check = main.page_has_target_highlight
+    def counting_check(page):
+        checked.append(page.number)
+        return real_check(page)
+    monkeypatch.setattr(main, 'page_has_target_highlight', counting_check)
+
+    with open_pdf(pages=10, highlights={0: RED, 3: YELLOW, 7: YELLOW}) as doc:
+        assert main.probe_document(doc) == 3
+    assert checked == [0, 1, 2, 3]
+
+def test_probe_finds_nothing():
+    with open_pdf(pages=3, highlights={1: RED}) as doc:
+        assert main.probe_document(doc) is None
+    with open_pdf(pages=3) as doc:
+        assert main.probe_document(doc) is None
+
+def test_wilson_interval():
+    assert main.wilson_interval(0, 0) == (0.0, 1.0)
+    low, high = main.wilson_interval(0, 100)
+    assert low == 0.0 and 0 < high < 0.05
+    low, high = main.wilson_interval(50, 100)
+    assert low == pytest.approx(0.404, abs=0.001) and high == pytest.approx(0.596, abs=0.001)
+    low, high = main.wilson_interval(100, 100)
+    assert 0.95 < low < 1.0 and high == pytest.approx(1.0)
+
+def test_small_documents_are_counted_exactly():
+    with open_pdf(pages=6, highlights={1: YELLOW, 4: YELLOW, 5: RED}) as doc:
+        result = main.estimate_document(doc, sample_size=10)
+    assert result == {'pages': 6, 'sampled': 6, 'estimate': 2, 'low': 2, 'high': 2, 'exact': True}
+
+def test_large_documents_are_sampled(monkeypatch):
+    monkeypatch.setattr(main.random, 'sample', lambda population, k: list(population)[:k])
+    with open_pdf(pages=40, highlights={page: YELLOW for page in range(0, 40, 4)}) as doc:
+        result = main.estimate_document(doc, sample_size=20)
+    assert result['sampled'] == 20 and not result['exact']
+    assert result['estimate'] == 10
+    assert result['low'] <= 10 <= result['high'] <= 40
+
+@pytest.mark.parametrize('scan_mode, event', [('probe', 'file_probed'), ('estimate', 'file_estimated')])
+def test_triage_modes_create_nothing(tmp_path, write_pdf, monkeypatch, scan_mode, event):
+    monkeypatch.setattr(main, 'RESUME', False)
+    write_pdf('a.pdf', pages=3, highlights={2: YELLOW})
+    write_pdf('b.pdf', pages=3)
+
+    records = []
+    main.create_pdf_from_specific_highlights(str(tmp_path), '_hl.pdf', scan_mode,
+                                             events=highlight_events.EventStream([records.append]))
+    assert [r['file'] for r in records if r['event'] == event] == ['a.pdf', 'b.pdf']
+    assert records[-1]['with_matches'] == 1 and records[-1]['created'] == 0
+    assert sorted(path.name for path in tmp_path.iterdir()) == ['a.pdf', 'b.pdf']
+
+def test_settings_are_read_when_the_run_starts(tmp_path, write_pdf, monkeypatch):
+    monkeypatch.setattr(main, 'RESUME', False)
+    monkeypatch.setattr(main, 'SAMPLE_SIZE', 4)
+    monkeypatch.setattr(main, 'REPORT_STYLE', 'quiet')
+    monkeypatch.setattr(main, 'EVENT_LOG_PATH', str(tmp_path / 'events.jsonl'))
+    events = main.make_event_stream()
+    events.close()
+    assert [type(sink) for sink in events.sinks] == [highlight_events.JsonlSink]
+
+    write_pdf('a.pdf', pages=10, highlights={2: YELLOW})
+    records = []
+    main.create_pdf_from_specific_highlights(str(tmp_path), '_hl.pdf', 'estimate',
+                                             events=highlight_events.EventStream([records.append]))
+    assert [r['sampled'] for r in records if r['event'] == 'file_estimated'] == [4]
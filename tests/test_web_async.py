@@ -0,0 +1,91 @@
+import asyncio
+import io
+import json
+import threading
+
+import pytest
+
+pytest.importorskip('quart')
+
+from werkzeug.datastructures import FileStorage
+
+import admission
+import chunked_uploads
+import main_async
+import output_store
+from conftest import make_pdf, page_count
+
+@pytest.fixture
+def run(tmp_path, monkeypatch):
+    """
+    Runs a coroutine function with a fresh test client of the Quart app.
+    """
+    monkeypatch.setattr(chunked_uploads, 'UPLOAD_DIR', str(tmp_path / 'uploads'))
+    monkeypatch.setattr(output_store, 'OUTPUT_DIR', str(tmp_path / 'outputs'))
+    return lambda test: asyncio.run(test(main_async.app.test_client()))
+
+def pdf_file(data, filename='a.pdf'):
+    return FileStorage(io.BytesIO(data), filename=filename, content_type='application/pdf')
+
+async def upload(client, data):
+    response = await client.post('/uploads', json={'filename': 'book.pdf', 'size': len(data)})
+    upload_id = (await response.get_json())['upload_id']
+    for offset in range(0, len(data), chunked_uploads.CHUNK_SIZE):
+        await client.put(f'/uploads/{upload_id}/chunks?offset={offset}',
+                         data=data[offset:offset + chunked_uploads.CHUNK_SIZE])
+    return upload_id
+
+def test_index_page(run):
+    async def test(client):
+        response = await client.get('/')
+        assert response.status_code == 200
+        assert b'<!DOCTYPE html>' in await response.get_data()
+    run(test)
+
+def test_merge_of_a_file_and_an_upload(run):
+    async def test(client):
+        upload_id = await upload(client, make_pdf(2))
+        response = await client.post('/merge_pdfs', form={'upload_ids': upload_id},
+                                     files={'pdf_files': pdf_file(make_pdf(1))})
+        assert response.mimetype == 'application/pdf'
+        assert page_count(await response.get_data()) == 3
+        assert (await client.get(f'/uploads/{upload_id}')).status_code == 404
+    run(test)
+
+def test_merge_rejects_bad_image_resolution(run):
+    async def test(client):
+        upload_id = await upload(client, make_pdf(2))
+        response = await client.post('/merge_pdfs', form={'upload_ids': upload_id, 'image_dpi': '0'},
+                                     files={'pdf_files': pdf_file(make_pdf(1))})
+        assert b'positive number of dpi' in await response.get_data()
+        assert (await client.get(f'/uploads/{upload_id}')).status_code == 200
+    run(test)
+
+def test_pipeline_reports_unreadable_input_as_json(run):
+    async def test(client):
+        response = await client.post('/pipeline', form={'operations': json.dumps([{'op': 'add_page_numbers'}])},
+                                     files={'pdf_files': pdf_file(b'junk', 'junk.pdf')})
+        assert response.status_code == 400
+        assert 'not a readable PDF' in (await response.get_json())['error']
+    run(test)
+
+def test_pdf_jobs_dont_hold_up_the_default_executor(run, monkeypatch):
+    started = threading.Event()
+    release = threading.Event()
+    job_threads = []
+    def slow_job(client_id, func, pdf_input, *args):
+        job_threads.append(threading.current_thread().name)
+        started.set()
+        release.wait(10)
+        return func(pdf_input, *args)
+    monkeypatch.setattr(admission, 'run_limited', slow_job)
+
+    async def test(client):
+        job = asyncio.ensure_future(client.post('/add_page_numbers', files={'pdf_file': pdf_file(make_pdf(1))}))
+        await asyncio.to_thread(started.wait, 10)
+        # Uploads still get through while the job is waiting.
+        await upload(client, make_pdf(1))
+        release.set()
+        assert (await job).mimetype == 'application/pdf'
+    run(test)
+    assert job_threads[0].startswith('pdf-job')
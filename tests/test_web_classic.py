@@ -0,0 +1,66 @@
+import importlib.util
+import io
+import os
+import zipfile
+
+import pytest
+
+pytest.importorskip('flask')
+
+import admission
+from conftest import ROOT, make_pdf, page_count
+
+@pytest.fixture(scope='module')
+def classic():
+    # Pdftools/main.py, the single-file app; 'main' is taken by the extractor.
+    spec = importlib.util.spec_from_file_location('classic_main', os.path.join(ROOT, 'Pdftools', 'main.py'))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+@pytest.fixture
+def client(classic):
+    return classic.app.test_client()
+
+@pytest.fixture
+def jobs(monkeypatch):
+    """
+    Records the functions sent through admission.run_limited.
+    """
+    started = []
+    real_run_limited = admission.run_limited
+    def recording_run_limited(client_id, func, pdf_input, *args):
+        started.append(func.__name__)
+        return real_run_limited(client_id, func, pdf_input, *args)
+    monkeypatch.setattr(admission, 'run_limited', recording_run_limited)
+    return started
+
+def test_numbering_runs_under_the_job_limits(client, jobs):
+    response = client.post('/add_page_numbers', data={'pdf_file': (io.BytesIO(make_pdf(2)), 'a.pdf')})
+    assert response.mimetype == 'application/pdf'
+    assert page_count(response.data) == 2
+    assert jobs == ['number_pdf_bytes']
+
+def test_split_runs_under_the_job_limits(client, jobs):
+    response = client.post('/split_pdf', data={'pdf_file': (io.BytesIO(make_pdf(3)), 'a.pdf'), 'page_ranges': '1, 2-3'})
+    assert response.mimetype == 'application/zip'
+    with zipfile.ZipFile(io.BytesIO(response.data)) as archive:
+        assert sorted(archive.namelist()) == ['split_pages_1.pdf', 'split_pages_2-3.pdf']
+    assert jobs == ['split_pdf_bytes']
+
+def test_unreadable_input_is_reported(client):
+    response = client.post('/add_page_numbers', data={'pdf_file': (io.BytesIO(b'junk'), 'a.pdf')})
+    assert response.mimetype == 'text/html'
+    assert b'not a readable PDF' in response.data
+
+def test_refused_job_is_reported(client, monkeypatch):
+    monkeypatch.setattr(admission, 'MAX_INPUT_BYTES', 10)
+    response = client.post('/split_pdf', data={'pdf_file': (io.BytesIO(make_pdf(3)), 'a.pdf'), 'page_ranges': '1'})
+    assert response.mimetype == 'text/html'
+    assert b'are not accepted' in response.data
+
+@pytest.mark.parametrize('page_ranges, message', [('1-x', b'Invalid page range format'),
+                                                  ('7-9', b'not valid for this document')])
+def test_bad_page_ranges_are_reported(client, page_ranges, message):
+    response = client.post('/split_pdf', data={'pdf_file': (io.BytesIO(make_pdf(3)), 'a.pdf'), 'page_ranges': page_ranges})
+    assert message in response.data
@@ -0,0 +1,56 @@
+import io
+import json
+
+import pytest
+
+pytest.importorskip('flask')
+
+import chunked_uploads
+import main2
+import output_store
+from conftest import make_pdf, page_count
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    monkeypatch.setattr(chunked_uploads, 'UPLOAD_DIR', str(tmp_path / 'uploads'))
+    monkeypatch.setattr(output_store, 'OUTPUT_DIR', str(tmp_path / 'outputs'))
+    return main2.app.test_client()
+
+def upload(client, data):
+    upload_id = client.post('/uploads', json={'filename': 'book.pdf', 'size': len(data)}).get_json()['upload_id']
+    for offset in range(0, len(data), chunked_uploads.CHUNK_SIZE):
+        client.put(f'/uploads/{upload_id}/chunks?offset={offset}',
+                   data=data[offset:offset + chunked_uploads.CHUNK_SIZE])
+    return upload_id
+
+def merge_form(**fields):
+    return dict(fields, pdf_files=[(io.BytesIO(make_pdf(1)), 'a.pdf'), (io.BytesIO(make_pdf(2)), 'b.pdf')])
+
+@pytest.mark.parametrize('image_dpi', ['0', '-150', 'high'])
+def test_merge_rejects_bad_image_resolution(client, image_dpi):
+    response = client.post('/merge_pdfs', data=merge_form(image_dpi=image_dpi))
+    assert response.mimetype == 'text/html'
+    assert b'positive number of dpi' in response.data
+
+def test_merge_without_image_resolution(client):
+    response = client.post('/merge_pdfs', data=merge_form(image_dpi=''))
+    assert response.mimetype == 'application/pdf'
+    assert page_count(response.data) == 3
+
+def test_pipeline_reports_unreadable_input_as_json(client):
+    response = client.post('/pipeline', data={
+        'operations': json.dumps([{'op': 'add_page_numbers'}]),
+        'pdf_files': [(io.BytesIO(b'junk'), 'junk.pdf')]})
+    assert response.status_code == 400
+    assert 'not a readable PDF' in response.get_json()['error']
+
+def test_upload_survives_a_failed_job_and_goes_after_a_good_one(client):
+    upload_id = upload(client, make_pdf(2))
+    bad_steps = json.dumps([{'op': 'select_pages', 'ranges': '9'}])
+    assert client.post('/pipeline', data={'operations': bad_steps, 'upload_ids': upload_id}).status_code == 400
+    assert client.get(f'/uploads/{upload_id}').status_code == 200
+
+    good_steps = json.dumps([{'op': 'add_page_numbers'}])
+    response = client.post('/pipeline', data={'operations': good_steps, 'upload_ids': upload_id})
+    assert response.status_code == 200 and page_count(response.data) == 2
+    assert client.get(f'/uploads/{upload_id}').status_code == 404